@@ -4,10 +4,11 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from config import Config
+from app.utils.db_routing import RoutingSession
 # from flask_moment import Moment
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 
@@ -31,11 +32,47 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     
     # Initialize extensions with app
+    from app.utils.db_engine import configure_engine, install_engine_hooks, collect_pool_stats
+    from app.utils.db_routing import configure_replicas
+    configure_engine(app)
+    configure_replicas(app)
     db.init_app(app)
+    install_engine_hooks(app, db)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
     
+    from app.utils.activity_logger import activity_logger
+    from app.utils.response_cache import response_cache
+    from app.utils.single_flight import single_flight
+    from app.utils.metrics import metrics, collect_component_stats
+    from app.utils.slow_query import slow_query_log
+    from app.utils.profiler import request_profiler
+    from app.utils.camp_index import camp_index, daily_camp_maintenance
+    from app.utils.scheduler import scheduler
+    from app.utils.storage import generated_storage, cleanup_generated_files
+    from app.utils.mailer import outbox_sender, send_outbox
+    from app.utils.compression import response_compressor, collect_compression_stats
+    from app.utils.assets import asset_pipeline
+    from app.utils.fragment_cache import fragment_cache, collect_fragment_cache_stats
+    activity_logger.init_app(app)
+    response_cache.init_app(app)
+    single_flight.init_app(app)
+    metrics.init_app(app)
+    metrics.register_collector(collect_component_stats)
+    metrics.register_collector(collect_pool_stats)
+    slow_query_log.init_app(app)
+    request_profiler.init_app(app)
+    camp_index.init_app(app)
+    generated_storage.init_app(app)
+    outbox_sender.init_app(app)
+    response_compressor.init_app(app)
+    metrics.register_collector(collect_compression_stats)
+    asset_pipeline.init_app(app)
+    fragment_cache.init_app(app)
+    metrics.register_collector(collect_fragment_cache_stats)
+    scheduler.init_app(app)
+    
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -53,6 +90,7 @@ def create_app(config_class=Config):
     from app.routes.hospital_routes import hospital_bp
     from app.routes.host_routes import host_bp
     from app.routes.admin_routes import admin_bp
+    from app.routes.api_routes import api_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -60,6 +98,29 @@ def create_app(config_class=Config):
     app.register_blueprint(hospital_bp, url_prefix='/hospital')
     app.register_blueprint(host_bp, url_prefix='/host')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api_bp, url_prefix='/api')
+    
+    # Register CLI commands
+    from app.utils.activity_archive import activity_cli
+    app.cli.add_command(activity_cli)
+    from app.utils.db_routing import replica_cli
+    app.cli.add_command(replica_cli)
+    from app.utils.donor_callout import donor_cli
+    app.cli.add_command(donor_cli)
+    from app.utils.mailer import mail_cli
+    app.cli.add_command(mail_cli)
+    from app.utils.assets import assets_cli
+    app.cli.add_command(assets_cli)
+    
+    # Register background jobs (schedules come from SCHEDULER_JOBS)
+    from app.utils.activity_archive import archive_activities
+    scheduler.add_job('camp_maintenance', daily_camp_maintenance, run_at_start=True)
+    scheduler.add_job('activity_archive', archive_activities)
+    scheduler.add_job('generated_file_cleanup', cleanup_generated_files)
+    scheduler.add_job('email_outbox', send_outbox)
+    from app.utils.request_queue import age_pending_requests
+    scheduler.add_job('request_aging', age_pending_requests)
+    scheduler.start()
 
     # ✅ Inject CSRF token into Jinja templates for manual HTML forms
     @app.context_processor
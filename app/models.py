@@ -1,9 +1,13 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects import mysql
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 
+# Row versions need sub-second precision; MySQL's DATETIME keeps whole seconds by default
+VersionTimestamp = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -18,6 +22,7 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False)  # patient, hospital, host, admin
     is_approved = db.Column(db.Boolean, default=True)  # False for hospital/host initially
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(VersionTimestamp, default=datetime.utcnow, onupdate=datetime.utcnow)  # row version for fragment cache keys
     
     # Additional fields for hospital
     hospital_name = db.Column(db.String(200))
@@ -30,10 +35,18 @@ class User(UserMixin, db.Model):
     camp_address = db.Column(db.Text)
     camp_contact = db.Column(db.String(20))
     
+    # Donor history, kept current by the donation approval routes
+    last_donation_date = db.Column(db.Date)
+    lifetime_units = db.Column(db.Integer, default=0, nullable=False)
+    
     # Relationships
     state = db.relationship('State', backref='users')
     city = db.relationship('City', backref='users')
     
+    __table_args__ = (
+        db.Index('ix_user_donor_callout', 'city_id', 'blood_group', 'last_donation_date'),
+    )
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -62,6 +75,12 @@ class BloodInventory(db.Model):
     
     hospital = db.relationship('User', backref='blood_inventory')
 
+# Starting queue priority by request type; pending requests gain priority as they wait
+REQUEST_PRIORITY = {'critical': 100, 'normal': 0}
+
+def _initial_priority(context):
+    return REQUEST_PRIORITY.get(context.get_current_parameters().get('request_type'), 0)
+
 class BloodRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -73,9 +92,16 @@ class BloodRequest(db.Model):
     request_date = db.Column(db.DateTime, default=datetime.utcnow)
     response_date = db.Column(db.DateTime)
     notes = db.Column(db.Text)
+    priority = db.Column(db.Integer, default=_initial_priority, server_default='0', nullable=False)
     
     patient = db.relationship('User', foreign_keys=[patient_id], backref='blood_requests')
     hospital = db.relationship('User', foreign_keys=[hospital_id], backref='received_requests')
+    
+    __table_args__ = (
+        # Serves the per-hospital queue: highest priority first, oldest first within a priority
+        db.Index('ix_blood_request_queue', hospital_id, status, priority.desc(), request_date),
+        db.Index('ix_blood_request_status_date', status, request_date),
+    )
 
 class BloodDonation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +114,7 @@ class BloodDonation(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     certificate_generated = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(VersionTimestamp, default=datetime.utcnow, onupdate=datetime.utcnow)  # row version for fragment cache keys
     
     donor = db.relationship('User', foreign_keys=[donor_id], backref='donations')
     hospital = db.relationship('User', foreign_keys=[hospital_id], backref='received_donations')
@@ -124,6 +151,58 @@ class Activity(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     activity_type = db.Column(db.String(50), nullable=False)  # donation, request, camp_registration
     description = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    donation_id = db.Column(db.Integer, db.ForeignKey('blood_donation.id'))
+    request_id = db.Column(db.Integer, db.ForeignKey('blood_request.id'))
+    
+    user = db.relationship('User', backref='activities')
+    donation = db.relationship('BloodDonation')
+    blood_request = db.relationship('BloodRequest')
+    
+    __table_args__ = (
+        db.Index('ix_activity_user_created', 'user_id', 'created_at'),
+    )
+
+class ActivityArchive(db.Model):
+    """Cold partition for activities older than the retention window"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # same id as the original Activity
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    activity_type = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, index=True)
+    donation_id = db.Column(db.Integer)
+    request_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScheduledJob(db.Model):
+    """Leader lock and run statistics for one background job (server local time)"""
+    name = db.Column(db.String(100), primary_key=True)
+    schedule = db.Column(db.String(100), nullable=False)
+    next_run_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_success_at = db.Column(db.DateTime)
+    last_duration = db.Column(db.Float)  # seconds
+    run_count = db.Column(db.Integer, default=0)
+    failure_count = db.Column(db.Integer, default=0)
+    consecutive_failures = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+
+class EmailOutbox(db.Model):
+    """Notification email queued in the same transaction as the change it reports"""
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
     
-    user = db.relationship('User', backref='activities')
\ No newline at end of file
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
@@ -1,6 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, abort
 from flask_login import login_required, current_user
 from app.models import User, BloodRequest, BloodDonation, BloodCamp, Activity, db
+from app.utils.activity_archive import hot_activities
+from app.utils.change_feed import publish_change, event_stream_response
+from app.utils.response_cache import invalidate_city, response_cache
+from app.utils.single_flight import single_flight
+from app.utils.metrics import metrics
+from app.utils.slow_query import slow_query_log
+from app.utils.profiler import request_profiler, PROFILE_HEADER, PROFILE_ARG
+from app.utils.scheduler import scheduler
+from app.utils.storage import generated_storage
+from app.utils.db_routing import read_only
+from app.utils.mailer import notify_account_approved
+from app.utils.projections import user_list_rows
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
@@ -14,6 +26,7 @@ def require_admin():
         return redirect(url_for('main.home'))
 
 @admin_bp.route('/dashboard')
+@read_only
 def dashboard():
     """Admin dashboard"""
     # Get pending approvals
@@ -27,7 +40,7 @@ def dashboard():
     active_camps = BloodCamp.query.filter_by(is_active=True).count()
     
     # Get recent activities
-    recent_activities = Activity.query.order_by(Activity.created_at.desc()).limit(10).all()
+    recent_activities = hot_activities().order_by(Activity.created_at.desc()).limit(10).all()
     
     return render_template('admin/dashboard.html',
                          pending_hospitals=pending_hospitals,
@@ -38,7 +51,13 @@ def dashboard():
                          active_camps=active_camps,
                          recent_activities=recent_activities)
 
+@admin_bp.route('/dashboard/stream')
+def dashboard_stream():
+    """Server-Sent Events feed of dashboard changes"""
+    return event_stream_response('admin')
+
 @admin_bp.route('/approvals')
+@read_only
 def approvals():
     """View pending approvals"""
     pending_hospitals = User.query.filter_by(role='hospital', is_approved=False).all()
@@ -58,7 +77,10 @@ def approve_user(user_id):
     ).first_or_404()
     
     user.is_approved = True
+    notify_account_approved(user)
     db.session.commit()
+    publish_change('admin', 'user_approved', counters={f'pending_{user.role}s': -1})
+    invalidate_city(user.state_id, user.city_id)
     
     flash(f'{user.role.title()} "{user.hospital_name or user.camp_name}" approved successfully', 'success')
     return redirect(url_for('admin.approvals'))
@@ -75,15 +97,17 @@ def reject_user(user_id):
     # Delete the user record
     db.session.delete(user)
     db.session.commit()
+    publish_change('admin', 'user_rejected', counters={f'pending_{user.role}s': -1, 'total_users': -1})
+    invalidate_city(user.state_id, user.city_id)
     
     flash(f'{user.role.title()} application rejected and removed', 'info')
     return redirect(url_for('admin.approvals'))
 
 @admin_bp.route('/users')
+@read_only
 def manage_users():
     """Manage all users"""
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/users.html', users=users)
+    return render_template('admin/users.html', users=user_list_rows())
 
 @admin_bp.route('/deactivate-user/<int:user_id>')
 def deactivate_user(user_id):
@@ -95,6 +119,7 @@ def deactivate_user(user_id):
     
     user.is_approved = False
     db.session.commit()
+    invalidate_city(user.state_id, user.city_id)
     
     flash(f'{user.role.title()} deactivated', 'info')
     return redirect(url_for('admin.manage_users'))
@@ -109,11 +134,13 @@ def activate_user(user_id):
     
     user.is_approved = True
     db.session.commit()
+    invalidate_city(user.state_id, user.city_id)
     
     flash(f'{user.role.title()} activated', 'success')
     return redirect(url_for('admin.manage_users'))
 
 @admin_bp.route('/system-stats')
+@read_only
 def system_stats():
     """View system statistics"""
     # User statistics
@@ -139,10 +166,63 @@ def system_stats():
         'total_camps': BloodCamp.query.count()
     }
     
+    # Performance statistics for this worker process
+    perf_stats = {
+        'response_cache': response_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'storage': dict(generated_storage.stats(), usage=generated_storage.usage())
+    }
+    
     return render_template('admin/stats.html',
                          user_stats=user_stats,
                          blood_stats=blood_stats,
-                         camp_stats=camp_stats)
+                         camp_stats=camp_stats,
+                         perf_stats=perf_stats,
+                         scheduled_jobs=scheduler.job_stats())
+
+@admin_bp.route('/metrics')
+def prometheus_metrics():
+    """Request, database and template timings in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@admin_bp.route('/slow-queries', methods=['GET', 'POST'])
+def slow_queries():
+    """Statements over the slow-query threshold, worst first"""
+    if request.method == 'POST':
+        slow_query_log.reset()
+        flash('Slow query statistics cleared', 'success')
+        return redirect(url_for('admin.slow_queries'))
+    
+    return render_template('admin/slow_queries.html',
+                         statements=slow_query_log.top(request.args.get('limit', 25, type=int)),
+                         threshold_ms=slow_query_log.threshold * 1000)
+
+@admin_bp.route('/profiles', methods=['GET', 'POST'])
+def profiles():
+    """Issue profiling tokens and list captured request profiles"""
+    token = expires_at = None
+    if request.method == 'POST':
+        minutes = request.form.get('minutes', 5, type=int) or 5
+        token, expires_at = request_profiler.issue_token(current_user.id, minutes)
+        flash(f'Profiling token valid until {expires_at:%H:%M:%S} UTC', 'success')
+    
+    return render_template('admin/profiles.html',
+                         profiles=request_profiler.list_profiles(),
+                         token=token,
+                         expires_at=expires_at,
+                         max_minutes=request_profiler.max_age // 60,
+                         profile_header=PROFILE_HEADER,
+                         profile_arg=PROFILE_ARG)
+
+@admin_bp.route('/profiles/<profile_id>')
+def profile_detail(profile_id):
+    """Top functions of one captured profile"""
+    sort = 'tottime' if request.args.get('sort') == 'tottime' else 'cumulative'
+    meta, rows = request_profiler.load_profile(profile_id, sort=sort)
+    if meta is None:
+        abort(404)
+    
+    return render_template('admin/profile_detail.html', meta=meta, rows=rows, sort=sort)
 
 # Admin can perform patient actions
 @admin_bp.route('/patient-actions')
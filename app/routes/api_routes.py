@@ -0,0 +1,124 @@
+import hashlib
+from datetime import timezone
+from flask import Blueprint, request, jsonify, current_app, abort
+from sqlalchemy import and_, case, func
+from app.models import User, BloodInventory, State, City, db
+from app.utils.blood_groups import BLOOD_GROUPS
+from app.utils.db_routing import read_only
+
+api_bp = Blueprint('api', __name__)
+
+
+@api_bp.errorhandler(400)
+def bad_request(error):
+    return jsonify({'error': error.description}), 400
+
+
+def _inventory_filters():
+    """Build the scope conditions, visibility condition and echoed filters from the query string"""
+    hospital_id = request.args.get('hospital_id', type=int)
+    state_id = request.args.get('state_id', type=int)
+    city_id = request.args.get('city_id', type=int)
+    blood_group = request.args.get('blood_group', '').strip().upper()
+
+    if blood_group and blood_group not in BLOOD_GROUPS:
+        abort(400, description='Unknown blood group')
+
+    # Rows the feed could ever show; the listing then keeps only approved
+    # hospitals with stock
+    scope = [User.role == 'hospital']
+    if hospital_id:
+        scope.append(BloodInventory.hospital_id == hospital_id)
+    if state_id:
+        scope.append(User.state_id == state_id)
+    if city_id:
+        scope.append(User.city_id == city_id)
+    if blood_group:
+        scope.append(BloodInventory.blood_group == blood_group)
+    visible = and_(User.is_approved == True, BloodInventory.units_available > 0)
+
+    filters = {'hospital_id': hospital_id, 'state_id': state_id,
+               'city_id': city_id, 'blood_group': blood_group or None}
+    return scope, visible, filters
+
+
+@api_bp.route('/inventory')
+@read_only
+def inventory():
+    """Read-only blood availability feed for partner systems.
+
+    The validators come from a single aggregate query, so a poller whose
+    copy is still current gets ``304 Not Modified`` without any inventory
+    rows being loaded. The ETag covers the listed rows only; Last-Modified
+    covers every row in the filter's scope, so stock that drains to zero or
+    a hospital losing approval still moves it for pollers that only send
+    ``If-Modified-Since``.
+    """
+    scope, visible, filters = _inventory_filters()
+
+    (last_updated, row_count, total_units, hospitals_updated,
+     scope_inventory_updated, scope_hospitals_updated) = db.session.query(
+        func.max(case((visible, BloodInventory.last_updated))),
+        func.count(case((visible, BloodInventory.id))),
+        func.sum(case((visible, BloodInventory.units_available))),
+        func.max(case((visible, User.updated_at))),
+        func.max(BloodInventory.last_updated),
+        func.max(User.updated_at)
+    ).join(User, BloodInventory.hospital_id == User.id).filter(*scope).one()
+
+    # Hospital versions cover renames, which change the body too
+    fingerprint = f'{sorted(filters.items())}|{last_updated}|{row_count}|{total_units}|{hospitals_updated}'
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    # Last-Modified must also move when a row leaves the listing: drained
+    # stock and deactivated hospitals are still in scope, and deleting an
+    # inventory row bumps its hospital's updated_at
+    changed = max((value for value in (scope_inventory_updated, scope_hospitals_updated) if value), default=None)
+    last_modified = changed.replace(microsecond=0, tzinfo=timezone.utc) if changed else None
+
+    # If-None-Match takes precedence over If-Modified-Since. It uses the weak
+    # comparison, since compressed copies carry the tag as W/"..."
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = bool(last_modified and request.if_modified_since and
+                            last_modified <= request.if_modified_since)
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        rows = db.session.query(
+            BloodInventory.hospital_id,
+            User.hospital_name,
+            State.name.label('state'),
+            City.name.label('city'),
+            BloodInventory.blood_group,
+            BloodInventory.units_available,
+            BloodInventory.last_updated
+        ).join(User, BloodInventory.hospital_id == User.id)\
+         .join(State, User.state_id == State.id)\
+         .join(City, User.city_id == City.id)\
+         .filter(*scope, visible)\
+         .order_by(User.hospital_name, BloodInventory.blood_group).all()
+
+        # The body must depend only on the validators, since the ETag is strong;
+        # the response's Date header says when it was generated
+        response = jsonify({
+            'filters': filters,
+            'total_units': total_units or 0,
+            'inventory': [{
+                'hospital_id': row.hospital_id,
+                'hospital_name': row.hospital_name,
+                'state': row.state,
+                'city': row.city,
+                'blood_group': row.blood_group,
+                'units_available': row.units_available,
+                'last_updated': row.last_updated.isoformat() + 'Z' if row.last_updated else None
+            } for row in rows]
+        })
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('API_CACHE_MAX_AGE', 15)
+    return response
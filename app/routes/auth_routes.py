@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from app.models import User, db
 from app.utils.location_data import get_states, get_cities_by_state
+from app.utils.change_feed import publish_change
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -96,6 +97,11 @@ def register():
         db.session.add(user)
         db.session.commit()
         
+        counters = {'total_users': 1}
+        if role in ['hospital', 'host']:
+            counters[f'pending_{role}s'] = 1
+        publish_change('admin', 'user_registered', counters=counters)
+        
         if role in ['hospital', 'host']:
             flash('Registration successful! Your account is pending approval. Admin will contact you soon.', 'info')
         else:
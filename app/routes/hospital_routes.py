@@ -3,6 +3,15 @@ from flask_login import login_required, current_user
 from app.models import BloodInventory, BloodRequest, BloodDonation, Activity, db
 from app.utils.certificate_generator import generate_donation_certificate
 from app.utils.report_generator import generate_donation_report, generate_request_report
+from app.utils.change_feed import publish_change, event_stream_response
+from app.utils.response_cache import invalidate_city
+from app.utils.file_serving import send_generated_file
+from app.utils.db_routing import read_only
+from app.utils.donor_callout import eligible_donors, record_approved_donation
+from app.utils.mailer import notify_donation_approved, notify_request_decision
+from app.utils.request_queue import top_critical, response_sla, record_response
+from app.utils.view_models import HospitalRequestsView
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 import os
 
@@ -17,6 +26,7 @@ def require_hospital():
         return redirect(url_for('main.home'))
 
 @hospital_bp.route('/dashboard')
+@read_only
 def dashboard():
     """Hospital dashboard"""
     # Get inventory summary
@@ -37,7 +47,14 @@ def dashboard():
                          total_units=total_units,
                          pending_requests=pending_requests,
                          pending_donations=pending_donations,
-                         recent_requests=recent_requests)
+                         recent_requests=recent_requests,
+                         critical_queue=top_critical(current_user.id),
+                         response_sla=response_sla(current_user.id))
+
+@hospital_bp.route('/dashboard/stream')
+def dashboard_stream():
+    """Server-Sent Events feed of dashboard changes"""
+    return event_stream_response(f'hospital:{current_user.id}')
 
 @hospital_bp.route('/inventory', methods=['GET', 'POST'])
 def manage_inventory():
@@ -67,6 +84,7 @@ def manage_inventory():
                 db.session.add(inventory)
             
             db.session.commit()
+            publish_change(f'hospital:{current_user.id}', 'inventory_changed', counters={'total_units': units})
             flash(f'Added {units} units of {blood_group} blood to inventory', 'success')
         
         elif action == 'update':
@@ -78,9 +96,11 @@ def manage_inventory():
                 hospital_id=current_user.id
             ).first_or_404()
             
+            delta = new_units - inventory.units_available
             inventory.units_available = new_units
             inventory.last_updated = datetime.utcnow()
             db.session.commit()
+            publish_change(f'hospital:{current_user.id}', 'inventory_changed', counters={'total_units': delta})
             
             flash(f'Updated {inventory.blood_group} inventory to {new_units} units', 'success')
         
@@ -92,11 +112,16 @@ def manage_inventory():
                 hospital_id=current_user.id
             ).first_or_404()
             
+            removed_units = inventory.units_available
             db.session.delete(inventory)
+            # Moves the inventory API's Last-Modified, which cannot see deleted rows
+            current_user.updated_at = datetime.utcnow()
             db.session.commit()
+            publish_change(f'hospital:{current_user.id}', 'inventory_changed', counters={'total_units': -removed_units})
             
             flash(f'Removed {inventory.blood_group} from inventory', 'success')
         
+        invalidate_city(current_user.state_id, current_user.city_id)
         return redirect(url_for('hospital.manage_inventory'))
     
     inventory = BloodInventory.query.filter_by(hospital_id=current_user.id).all()
@@ -107,9 +132,12 @@ def manage_inventory():
                          blood_groups=blood_groups)
 
 @hospital_bp.route('/donors')
+@read_only
 def view_donors():
     """View and approve donors"""
-    donations = BloodDonation.query.filter_by(hospital_id=current_user.id)\
+    # Donors are loaded up front since their versions are part of the fragment cache keys
+    donations = BloodDonation.query.options(joinedload(BloodDonation.donor))\
+                                  .filter_by(hospital_id=current_user.id)\
                                   .order_by(BloodDonation.created_at.desc()).all()
     
     return render_template('hospital/donors.html', donations=donations)
@@ -126,6 +154,7 @@ def approve_donation(donation_id):
     # Update donation status
     donation.status = 'approved'
     donation.certificate_generated = True
+    units_donated = donation.units_donated
     
     # Update inventory
     inventory = BloodInventory.query.filter_by(
@@ -144,7 +173,13 @@ def approve_donation(donation_id):
         )
         db.session.add(inventory)
     
+    record_approved_donation(donation)
+    notify_donation_approved(donation)
     db.session.commit()
+    publish_change(f'hospital:{current_user.id}', 'donation_approved',
+                   counters={'pending_donations': -1, 'total_units': units_donated})
+    publish_change('admin', 'donation_approved', counters={'total_donations': 1})
+    invalidate_city(current_user.state_id, current_user.city_id)
     
     flash('Donation approved and added to inventory', 'success')
     return redirect(url_for('hospital.view_donors'))
@@ -160,17 +195,25 @@ def reject_donation(donation_id):
     
     donation.status = 'rejected'
     db.session.commit()
+    publish_change(f'hospital:{current_user.id}', 'donation_rejected', counters={'pending_donations': -1})
     
     flash('Donation rejected', 'info')
     return redirect(url_for('hospital.view_donors'))
 
 @hospital_bp.route('/requests')
+@read_only
 def view_requests():
-    """View blood requests"""
-    requests = BloodRequest.query.filter_by(hospital_id=current_user.id)\
-                                .order_by(BloodRequest.request_date.desc()).all()
+    """View blood requests, pending ones in queue order"""
+    return render_template('hospital/requests.html', view=HospitalRequestsView(current_user.id))
+
+@hospital_bp.route('/requests/<int:request_id>/donors')
+@read_only
+def donor_callout(request_id):
+    """Eligible donors nearby to call for a request"""
+    blood_request = BloodRequest.query.filter_by(id=request_id, hospital_id=current_user.id).first_or_404()
+    donors = eligible_donors(current_user.city_id, blood_request.blood_group)
     
-    return render_template('hospital/requests.html', requests=requests)
+    return render_template('hospital/callout.html', blood_request=blood_request, donors=donors)
 
 @hospital_bp.route('/approve-request/<int:request_id>')
 def approve_request(request_id):
@@ -196,10 +239,16 @@ def approve_request(request_id):
     blood_request.response_date = datetime.utcnow()
     
     # Update inventory
-    inventory.units_available -= blood_request.units_requested
+    units_requested = blood_request.units_requested
+    inventory.units_available -= units_requested
     inventory.last_updated = datetime.utcnow()
     
+    notify_request_decision(blood_request)
     db.session.commit()
+    record_response(blood_request)
+    publish_change(f'hospital:{current_user.id}', 'request_approved',
+                   counters={'pending_requests': -1, 'total_units': -units_requested})
+    invalidate_city(current_user.state_id, current_user.city_id)
     
     flash('Blood request approved', 'success')
     return redirect(url_for('hospital.view_requests'))
@@ -217,17 +266,22 @@ def reject_request(request_id):
     blood_request.response_date = datetime.utcnow()
     blood_request.notes = request.form.get('rejection_reason', '')
     
+    notify_request_decision(blood_request)
     db.session.commit()
+    record_response(blood_request)
+    publish_change(f'hospital:{current_user.id}', 'request_rejected', counters={'pending_requests': -1})
     
     flash('Blood request rejected', 'info')
     return redirect(url_for('hospital.view_requests'))
 
 @hospital_bp.route('/reports')
+@read_only
 def reports():
     """Generate and download reports"""
     return render_template('hospital/reports.html')
 
 @hospital_bp.route('/download-report/<report_type>')
+@read_only
 def download_report(report_type):
     """Download CSV reports"""
     if report_type == 'donations_monthly':
@@ -242,9 +296,4 @@ def download_report(report_type):
         flash('Invalid report type', 'error')
         return redirect(url_for('hospital.reports'))
     
-    # Build absolute reports directory using the app root
-    reports_dir = os.path.join(current_app.root_path, 'static', 'reports')
-    os.makedirs(reports_dir, exist_ok=True)
-
-    filepath = os.path.join(reports_dir, filename)
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    return send_generated_file('reports', filename, download_name=filename)
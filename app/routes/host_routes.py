@@ -3,6 +3,13 @@ from flask_login import login_required, current_user
 from app.models import BloodCamp, CampInventory, BloodDonation, db
 from app.utils.location_data import get_states, get_cities_by_state
 from app.utils.report_generator import generate_camp_donor_report
+from app.utils.change_feed import publish_change, event_stream_response
+from app.utils.response_cache import invalidate_city
+from app.utils.file_serving import send_generated_file
+from app.utils.camp_index import camp_index
+from app.utils.db_routing import read_only
+from app.utils.donor_callout import record_approved_donation
+from app.utils.mailer import notify_donation_approved
 from datetime import datetime, date
 import os
 
@@ -17,6 +24,7 @@ def require_host():
         return redirect(url_for('main.home'))
 
 @host_bp.route('/dashboard')
+@read_only
 def dashboard():
     """Host dashboard"""
     # Get active camps
@@ -34,13 +42,20 @@ def dashboard():
     
     # add today's date as a Python date (so it can be compared to camp.start_date/end_date which are db.Date)
     today = date.today()
+    running_camp_ids = camp_index.camp_ids_for_host(current_user.id)
     
     return render_template('host/dashboard.html',
                          today=today,
+                         running_camp_ids=running_camp_ids,
                          active_camps=active_camps,
                          pending_donations=pending_donations,
                          recent_camps=recent_camps)
 
+@host_bp.route('/dashboard/stream')
+def dashboard_stream():
+    """Server-Sent Events feed of dashboard changes"""
+    return event_stream_response(f'host:{current_user.id}')
+
 @host_bp.route('/camps', methods=['GET', 'POST'])
 def manage_camps():
     """Manage blood camps"""
@@ -75,12 +90,17 @@ def manage_camps():
             
             db.session.add(camp)
             db.session.commit()
+            camp_index.refresh_camp(camp)
+            publish_change(f'host:{current_user.id}', 'camp_created', counters={'active_camps': 1})
+            publish_change('admin', 'camp_created', counters={'active_camps': 1})
+            invalidate_city(state_id, city_id)
             
             flash('Blood camp created successfully', 'success')
         
         elif action == 'update':
             camp_id = int(request.form.get('camp_id'))
             camp = BloodCamp.query.filter_by(id=camp_id, host_id=current_user.id).first_or_404()
+            old_location = (camp.state_id, camp.city_id)
             
             camp.name = request.form.get('name')
             camp.address = request.form.get('address')
@@ -89,16 +109,27 @@ def manage_camps():
             camp.start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d').date()
             camp.end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d').date()
             camp.contact_number = request.form.get('contact_number')
+            new_location = (camp.state_id, camp.city_id)
             
             db.session.commit()
+            camp_index.refresh_camp(camp)
+            invalidate_city(*old_location)
+            invalidate_city(*new_location)
             flash('Camp updated successfully', 'success')
         
         elif action == 'deactivate':
             camp_id = int(request.form.get('camp_id'))
             camp = BloodCamp.query.filter_by(id=camp_id, host_id=current_user.id).first_or_404()
             
+            was_active = camp.is_active
+            location = (camp.state_id, camp.city_id)
             camp.is_active = False
             db.session.commit()
+            camp_index.refresh_camp(camp)
+            if was_active:
+                publish_change(f'host:{current_user.id}', 'camp_deactivated', counters={'active_camps': -1})
+                publish_change('admin', 'camp_deactivated', counters={'active_camps': -1})
+            invalidate_city(*location)
             
             flash('Camp deactivated', 'info')
         
@@ -162,6 +193,7 @@ def manage_inventory(camp_id):
                          blood_groups=blood_groups)
 
 @host_bp.route('/donors')
+@read_only
 def view_donors():
     """View donors across all camps"""
     donations = BloodDonation.query.join(BloodCamp)\
@@ -199,7 +231,11 @@ def approve_donation(donation_id):
         )
         db.session.add(inventory)
     
+    record_approved_donation(donation)
+    notify_donation_approved(donation)
     db.session.commit()
+    publish_change(f'host:{current_user.id}', 'donation_approved', counters={'pending_donations': -1})
+    publish_change('admin', 'donation_approved', counters={'total_donations': 1})
     
     flash('Donation approved and added to inventory', 'success')
     return redirect(url_for('host.view_donors'))
@@ -214,28 +250,23 @@ def reject_donation(donation_id):
     
     donation.status = 'rejected'
     db.session.commit()
+    publish_change(f'host:{current_user.id}', 'donation_rejected', counters={'pending_donations': -1})
     
     flash('Donation rejected', 'info')
     return redirect(url_for('host.view_donors'))
 
 @host_bp.route('/reports')
+@read_only
 def reports():
     """View reports page"""
     camps = BloodCamp.query.filter_by(host_id=current_user.id).all()
     return render_template('host/reports.html', camps=camps)
 @host_bp.route('/download-report/<int:camp_id>')
+@read_only
 def download_report(camp_id):
     """Download camp donor report"""
     camp = BloodCamp.query.filter_by(id=camp_id, host_id=current_user.id).first_or_404()
 
     filename = generate_camp_donor_report(camp_id)
 
-    # Build absolute reports directory using the app root (avoids duplicated 'app\\app')
-    reports_dir = os.path.join(current_app.root_path, 'static', 'reports')
-
-    # Ensure directory exists (safe even if generator already created it)
-    os.makedirs(reports_dir, exist_ok=True)
-
-    filepath = os.path.join(reports_dir, filename)
-
-    return send_file(filepath, as_attachment=True, download_name=f'{camp.name}_donors_report.csv')
+    return send_generated_file('reports', filename, download_name=f'{camp.name}_donors_report.csv')
@@ -1,23 +1,81 @@
 from flask import Blueprint, render_template, request, jsonify
-from app.models import User, BloodInventory, BloodCamp, State, City
+from app.models import User, BloodInventory, BloodCamp, State, City, db
 from app.utils.location_data import get_states, get_cities_by_state
+from app.utils.blood_groups import COMPATIBILITY_DATA
+from app.utils.response_cache import cached_response, city_tag
+from app.utils.single_flight import single_flight
+from app.utils.camp_index import camp_index
+from app.utils.db_routing import read_only
 from datetime import datetime
 
 main_bp = Blueprint('main', __name__)
 
+def _search_city_tags():
+    """Invalidation tags for a search keyed by state and city"""
+    return [city_tag(request.args.get('state_id', type=int), request.args.get('city_id', type=int))]
+
 @main_bp.route('/')
+@read_only
+@cached_response(ttl=300)
 def home():
     """Home page with blood compatibility chart and search options"""
     states = get_states()
     return render_template('home.html', states=states)
 
 @main_bp.route('/api/cities/<int:state_id>')
+@read_only
 def get_cities(state_id):
     """API endpoint to get cities for a state"""
     cities = get_cities_by_state(state_id)
     return jsonify([{'id': city.id, 'name': city.name} for city in cities])
 
+def _find_blood(state_id, city_id, blood_group):
+    """Hospitals in a city with blood available, as plain shareable dicts"""
+    query = db.session.query(
+        User.id,
+        User.hospital_name,
+        User.hospital_address,
+        User.hospital_contact,
+        State.name.label('state'),
+        City.name.label('city'),
+        BloodInventory.blood_group,
+        BloodInventory.units_available
+    ).join(BloodInventory, BloodInventory.hospital_id == User.id)\
+     .join(State, User.state_id == State.id)\
+     .join(City, User.city_id == City.id)\
+     .filter(User.role == 'hospital',
+             User.is_approved == True,
+             User.state_id == state_id,
+             User.city_id == city_id,
+             BloodInventory.units_available > 0)
+    
+    if blood_group:
+        query = query.filter(BloodInventory.blood_group == blood_group)
+    
+    hospitals = {}
+    for row in query.order_by(User.id, BloodInventory.id):
+        if row.id not in hospitals:
+            hospitals[row.id] = {
+                'hospital': {
+                    'id': row.id,
+                    'hospital_name': row.hospital_name,
+                    'hospital_address': row.hospital_address,
+                    'hospital_contact': row.hospital_contact
+                },
+                'inventory': [],
+                'state': row.state,
+                'city': row.city
+            }
+        hospitals[row.id]['inventory'].append({
+            'blood_group': row.blood_group,
+            'units_available': row.units_available
+        })
+    
+    return list(hospitals.values())
+
 @main_bp.route('/search/blood')
+@read_only
+@cached_response(tags=_search_city_tags)
 def search_blood():
     """Search for blood availability in hospitals"""
     state_id = request.args.get('state_id', type=int)
@@ -27,32 +85,9 @@ def search_blood():
     if not all([state_id, city_id]):
         return render_template('search_results.html', hospitals=[], search_type='blood')
     
-    # Find hospitals in the selected city with blood inventory
-    hospitals_query = User.query.filter_by(
-        role='hospital', 
-        is_approved=True,
-        state_id=state_id,
-        city_id=city_id
-    )
-    
-    hospitals = []
-    for hospital in hospitals_query.all():
-        inventory_query = BloodInventory.query.filter_by(hospital_id=hospital.id)
-        
-        if blood_group:
-            inventory_query = inventory_query.filter_by(blood_group=blood_group)
-            inventory = inventory_query.filter(BloodInventory.units_available > 0).all()
-        else:
-            inventory = inventory_query.filter(BloodInventory.units_available > 0).all()
-        
-        if inventory:
-            hospital_data = {
-                'hospital': hospital,
-                'inventory': inventory,
-                'state': hospital.state.name,
-                'city': hospital.city.name
-            }
-            hospitals.append(hospital_data)
+    # Identical concurrent searches share a single computation
+    hospitals = single_flight.do(('search_blood', state_id, city_id, blood_group),
+                                 lambda: _find_blood(state_id, city_id, blood_group))
     
     return render_template('search_results.html', 
                          hospitals=hospitals, 
@@ -60,6 +95,8 @@ def search_blood():
                          selected_blood_group=blood_group)
 
 @main_bp.route('/search/camps')
+@read_only
+@cached_response(tags=_search_city_tags)
 def search_camps():
     """Search for active blood camps"""
     state_id = request.args.get('state_id', type=int)
@@ -68,33 +105,15 @@ def search_camps():
     if not all([state_id, city_id]):
         return render_template('search_results.html', camps=[], search_type='camps')
     
-    # Find active camps in the selected city
-    today = datetime.now().date()
-    camps = BloodCamp.query.filter_by(
-        state_id=state_id,
-        city_id=city_id,
-        is_active=True
-    ).filter(
-        BloodCamp.start_date <= today,
-        BloodCamp.end_date >= today
-    ).all()
+    # Camps running today in the selected city
+    camps = camp_index.camps_for_city(state_id, city_id)
     
     return render_template('search_results.html', 
                          camps=camps, 
                          search_type='camps')
 
 @main_bp.route('/compatibility')
+@cached_response(ttl=3600)
 def blood_compatibility():
     """Blood compatibility information page"""
-    compatibility_data = {
-        'A+': {'can_donate_to': ['A+', 'AB+'], 'can_receive_from': ['A+', 'A-', 'O+', 'O-']},
-        'A-': {'can_donate_to': ['A+', 'A-', 'AB+', 'AB-'], 'can_receive_from': ['A-', 'O-']},
-        'B+': {'can_donate_to': ['B+', 'AB+'], 'can_receive_from': ['B+', 'B-', 'O+', 'O-']},
-        'B-': {'can_donate_to': ['B+', 'B-', 'AB+', 'AB-'], 'can_receive_from': ['B-', 'O-']},
-        'AB+': {'can_donate_to': ['AB+'], 'can_receive_from': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']},
-        'AB-': {'can_donate_to': ['AB+', 'AB-'], 'can_receive_from': ['A-', 'B-', 'AB-', 'O-']},
-        'O+': {'can_donate_to': ['A+', 'B+', 'AB+', 'O+'], 'can_receive_from': ['O+', 'O-']},
-        'O-': {'can_donate_to': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'], 'can_receive_from': ['O-']},
-    }
-    
-    return render_template('compatibility.html', compatibility_data=compatibility_data)
\ No newline at end of file
+    return render_template('compatibility.html', compatibility_data=COMPATIBILITY_DATA)
\ No newline at end of file
@@ -3,6 +3,14 @@ from flask_login import login_required, current_user
 from app.models import User, BloodInventory, BloodRequest, BloodDonation, BloodCamp, Activity, db
 from app.utils.location_data import get_states, get_cities_by_state
 from app.utils.certificate_generator import generate_donation_certificate
+from app.utils.activity_logger import log_activity
+from app.utils.activity_archive import hot_activities
+from app.utils.camp_index import camp_index
+from app.utils.change_feed import publish_change
+from app.utils.file_serving import send_generated_file
+from app.utils.db_routing import read_only
+from app.utils.projections import hospitals_with_stock
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 import os
 # from app.models import Hospital
@@ -44,28 +52,16 @@ def search_blood():
 from app.models import User, BloodInventory  # Import User model instead of Hospital
 
 @patient_bp.route('/list-hospitals')
+@read_only
 @login_required
 def list_hospitals():
-    user_city = current_user.city_id  # We use the city_id from the logged-in patient.
-
-    # Get all hospitals in the patient's city
-    hospitals = User.query.filter_by(
-        role='hospital',
-        city_id=user_city
-    ).all()
-
-    # Now get their blood inventory
-    hospital_data = []
-    for hospital in hospitals:
-        inventory = BloodInventory.query.filter_by(hospital_id=hospital.id).all()
-        hospital_data.append({
-            'hospital': hospital,
-            'inventory': inventory
-        })
+    # Hospitals in the patient's city with their stock, as lightweight rows
+    hospital_data = hospitals_with_stock(current_user.city_id)
 
     return render_template('list_hosp.html', hospitals=hospital_data)
 
 @patient_bp.route('/dashboard')
+@read_only
 @login_required
 def dashboard():
     """Patient dashboard with recent activities and certificate download link"""
@@ -78,30 +74,10 @@ def dashboard():
         donor_id=current_user.id, status='pending'
     ).count()
 
-    # Recent activities (you might already have a query like this)
-    recent_activities = Activity.query.filter_by(
-        user_id=current_user.id
-    ).order_by(Activity.created_at.desc()).limit(10).all()
-
-    # Attach donation_id and certificate_generated to activities for template
-    for act in recent_activities:
-        if act.activity_type == 'donation':
-            donation = BloodDonation.query.filter_by(
-                donor_id=current_user.id
-            ).order_by(BloodDonation.created_at.desc()).first()
-
-            if donation:
-                act.donation_id = donation.id
-                act.certificate_generated = donation.certificate_generated
-                act.status = donation.status
-            else:
-                act.donation_id = None
-                act.certificate_generated = False
-                act.status = None
-        else:
-            act.donation_id = None
-            act.certificate_generated = False
-            act.status = None
+    # Recent activities with their linked donations, loaded in one query
+    recent_activities = hot_activities().options(joinedload(Activity.donation))\
+        .filter_by(user_id=current_user.id)\
+        .order_by(Activity.created_at.desc()).limit(10).all()
 
     return render_template(
         'patient/dashboard.html',
@@ -159,16 +135,22 @@ def request_blood(hospital_id):
             notes=notes
         )
         db.session.add(blood_request)
+        db.session.flush()
+        request_id = blood_request.id
+        description = f'Requested {units_requested} units of {blood_group} blood from {hospital.hospital_name}'
+        db.session.commit()
 
         # Log activity
-        activity = Activity(
-            user_id=current_user.id,
-            activity_type='request',
-            description=f'Requested {units_requested} units of {blood_group} blood from {hospital.hospital_name}'
-        )
-        db.session.add(activity)
-
-        db.session.commit()
+        log_activity(current_user.id, 'request', description, request_id=request_id)
+
+        # Notify live dashboards
+        publish_change(f'hospital:{hospital_id}', 'request_created', counters={'pending_requests': 1}, item={
+            'patient': current_user.name,
+            'blood_group': blood_group,
+            'units': units_requested,
+            'status': 'pending'
+        })
+        publish_change('admin', 'request_created', counters={'total_requests': 1})
         flash('Blood request submitted successfully', 'success')
         return redirect(url_for('patient.dashboard'))
 
@@ -200,18 +182,18 @@ def donate_blood():
         )
         
         db.session.add(donation)
+        db.session.flush()
+        donation_id = donation.id
         
-        # Add activity
         hospital = User.query.get(hospital_id)
-        activity = Activity(
-            user_id=current_user.id,
-            activity_type='donation',
-            description=f'Scheduled blood donation at {hospital.hospital_name} on {donation_date.strftime("%B %d, %Y")}'
-        )
-        db.session.add(activity)
+        description = f'Scheduled blood donation at {hospital.hospital_name} on {donation_date.strftime("%B %d, %Y")}'
         
         db.session.commit()
         
+        # Add activity
+        log_activity(current_user.id, 'donation', description, donation_id=donation_id)
+        publish_change(f'hospital:{hospital_id}', 'donation_created', counters={'pending_donations': 1})
+        
         flash('Blood donation scheduled successfully. Awaiting hospital approval.', 'success')
         return redirect(url_for('patient.dashboard'))
     
@@ -237,24 +219,26 @@ def register_camp():
         )
         
         db.session.add(donation)
+        db.session.flush()
+        donation_id = donation.id
         
-        # Add activity
         camp = BloodCamp.query.get(camp_id)
-        activity = Activity(
-            user_id=current_user.id,
-            activity_type='camp_registration',
-            description=f'Registered for blood camp: {camp.name} on {donation_date.strftime("%B %d, %Y")}'
-        )
-        db.session.add(activity)
+        host_id = camp.host_id
+        description = f'Registered for blood camp: {camp.name} on {donation_date.strftime("%B %d, %Y")}'
         
         db.session.commit()
         
+        # Add activity
+        log_activity(current_user.id, 'camp_registration', description, donation_id=donation_id)
+        publish_change(f'host:{host_id}', 'donation_created', counters={'pending_donations': 1})
+        
         flash('Camp registration successful. Awaiting approval.', 'success')
         return redirect(url_for('patient.dashboard'))
     
     return render_template('patient/register_camp.html', states=states)
 
 @patient_bp.route('/api/hospitals/<int:state_id>/<int:city_id>')
+@read_only
 def get_hospitals(state_id, city_id):
     """Get hospitals for a state and city"""
     hospitals = User.query.filter_by(
@@ -267,22 +251,16 @@ def get_hospitals(state_id, city_id):
     return {'hospitals': [{'id': h.id, 'name': h.hospital_name} for h in hospitals]}
 
 @patient_bp.route('/api/camps/<int:state_id>/<int:city_id>')
+@read_only
 def get_camps(state_id, city_id):
     """Get active camps for a state and city"""
-    today = date.today()
-    camps = BloodCamp.query.filter_by(
-        state_id=state_id,
-        city_id=city_id,
-        is_active=True
-    ).filter(
-        BloodCamp.start_date <= today,
-        BloodCamp.end_date >= today
-    ).all()
+    camps = camp_index.camps_for_city(state_id, city_id)
     
-    return {'camps': [{'id': c.id, 'name': c.name} for c in camps]}
+    return {'camps': [{'id': c['id'], 'name': c['name']} for c in camps]}
 
 
 @patient_bp.route('/my-requests')
+@read_only
 @login_required
 def my_requests():
     """View patient's blood requests"""
@@ -296,6 +274,7 @@ def my_requests():
 
 
 @patient_bp.route('/my-donations')
+@read_only
 def my_donations():
     """View patient's blood donations"""
     donations = BloodDonation.query.filter_by(donor_id=current_user.id)\
@@ -306,6 +285,7 @@ def my_donations():
 from flask import current_app  # make sure this import is at the top with the others
 
 @patient_bp.route('/download-certificate/<int:donation_id>')
+@read_only
 def download_certificate(donation_id):
     """Download donation certificate"""
     donation = BloodDonation.query.filter_by(
@@ -326,7 +306,4 @@ def download_certificate(donation_id):
         camp_name=camp_name
     )
     
-    # Use absolute path to avoid file not found errors
-    filepath = os.path.join(current_app.root_path, 'static', 'certificates', filename)
-    
-    return send_file(filepath, as_attachment=True, download_name=f'donation_certificate_{donation_id}.pdf')
+    return send_generated_file('certificates', filename, download_name=f'donation_certificate_{donation_id}.pdf')
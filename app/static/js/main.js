@@ -229,4 +229,42 @@ function downloadCSV(csv, filename) {
     document.body.appendChild(downloadLink);
     downloadLink.click();
     document.body.removeChild(downloadLink);
-}
\ No newline at end of file
+}
+
+// Live dashboard updates over Server-Sent Events
+function subscribeDashboard(url) {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource(url);
+    source.onmessage = function(e) {
+        const message = JSON.parse(e.data);
+        
+        if (message.event === 'resync') {
+            window.location.reload();
+            return;
+        }
+        
+        // Apply counter deltas
+        Object.keys(message.counters).forEach(function(name) {
+            document.querySelectorAll('[data-live-counter="' + name + '"]').forEach(function(el) {
+                el.textContent = (parseInt(el.textContent, 10) || 0) + message.counters[name];
+            });
+        });
+        
+        // Prepend new requests to the recent list
+        const list = document.querySelector('[data-live-list="recent_requests"]');
+        if (list && message.event === 'request_created' && message.item) {
+            const row = document.createElement('div');
+            row.className = 'list-group-item d-flex justify-content-between align-items-start';
+            row.innerHTML = '<div class="ms-2 me-auto"><div class="fw-bold"></div><small></small></div>' +
+                            '<span class="badge bg-warning rounded-pill"></span>';
+            row.querySelector('.fw-bold').textContent = message.item.patient;
+            row.querySelector('small').textContent = message.item.blood_group + ' - ' + message.item.units + ' units';
+            row.querySelector('.badge').textContent = message.item.status;
+            list.insertBefore(row, list.firstChild);
+            if (list.children.length > 5) {
+                list.removeChild(list.lastElementChild);
+            }
+        }
+    };
+}
@@ -0,0 +1,240 @@
+import glob
+import gzip
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from app.models import Activity, ActivityArchive, BloodDonation, BloodRequest, db
+
+ARCHIVE_COLUMNS = ['id', 'user_id', 'activity_type', 'description', 'created_at', 'donation_id', 'request_id']
+# An activity is logged right after the row it describes, so link it to the
+# user's latest matching row created within this window before it
+LINK_WINDOW = timedelta(minutes=10)
+
+
+def hot_cutoff():
+    """Oldest created_at that still belongs to the hot partition"""
+    days = current_app.config.get('ACTIVITY_RETENTION_DAYS', 90)
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def hot_activities():
+    """Activity query restricted to the hot partition"""
+    return Activity.query.filter(Activity.created_at >= hot_cutoff())
+
+
+def get_archive_dir():
+    """Directory holding compressed JSONL archives"""
+    archive_dir = current_app.config.get('ACTIVITY_ARCHIVE_DIR') or \
+        os.path.join(current_app.instance_path, 'activity_archive')
+    os.makedirs(archive_dir, exist_ok=True)
+    return archive_dir
+
+
+def archive_activities(retention_days=None, chunk_size=None, backend=None):
+    """Move activities older than the retention window out of the hot table.
+
+    Rows are moved in small id-ordered chunks, each in its own short
+    transaction, so the hot table is never locked for long. Returns the
+    number of rows archived.
+    """
+    config = current_app.config
+    if retention_days is None:
+        retention_days = config.get('ACTIVITY_RETENTION_DAYS', 90)
+    chunk_size = chunk_size or config.get('ACTIVITY_ARCHIVE_CHUNK_SIZE', 1000)
+    backend = backend or config.get('ACTIVITY_ARCHIVE_BACKEND', 'table')
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    columns = [getattr(Activity, name) for name in ARCHIVE_COLUMNS]
+    archived = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(Activity.created_at < cutoff, Activity.id > last_id)
+            .order_by(Activity.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+
+        rows = [dict(row) for row in rows]
+        ids = [row['id'] for row in rows]
+        try:
+            if backend == 'jsonl':
+                # Files are written before the delete, so a failure can only
+                # duplicate a chunk in the archive, never lose it
+                _write_jsonl(rows)
+            else:
+                now = datetime.utcnow()
+                db.session.execute(insert(ActivityArchive), [dict(row, archived_at=now) for row in rows])
+            db.session.execute(delete(Activity).where(Activity.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        archived += len(rows)
+        last_id = ids[-1]
+
+    return archived
+
+
+def backfill_activity_links(chunk_size=None):
+    """Link activities logged before donation_id/request_id existed.
+
+    Each unlinked donation, camp registration or request activity gets the
+    user's most recent donation (hospital or camp) or request created no
+    later than the activity and within ``LINK_WINDOW`` of it; activities
+    without such a row are left unlinked. Works through the hot table in
+    id-ordered chunks and returns the number of activities linked.
+    """
+    chunk_size = chunk_size or current_app.config.get('ACTIVITY_ARCHIVE_CHUNK_SIZE', 1000)
+    kinds = {
+        'donation': (BloodDonation, BloodDonation.donor_id, BloodDonation.created_at,
+                     BloodDonation.hospital_id.isnot(None), 'donation_id'),
+        'camp_registration': (BloodDonation, BloodDonation.donor_id, BloodDonation.created_at,
+                              BloodDonation.camp_id.isnot(None), 'donation_id'),
+        'request': (BloodRequest, BloodRequest.patient_id, BloodRequest.request_date, None, 'request_id'),
+    }
+    # Core executemany; an ORM update with a list of parameters would expect primary keys
+    table = Activity.__table__
+    statement = update(table).where(table.c.id == bindparam('activity_id'))
+    linked = 0
+    last_id = 0
+    while True:
+        activities = db.session.execute(
+            select(Activity.id, Activity.user_id, Activity.activity_type, Activity.created_at)
+            .where(Activity.id > last_id, Activity.activity_type.in_(kinds),
+                   Activity.donation_id.is_(None), Activity.request_id.is_(None))
+            .order_by(Activity.id)
+            .limit(chunk_size)
+        ).all()
+        if not activities:
+            break
+        last_id = activities[-1].id
+
+        updates = {name: [] for name in ('donation_id', 'request_id')}
+        for activity_type, (model, owner, created, condition, column) in kinds.items():
+            wanted = [a for a in activities if a.activity_type == activity_type]
+            if not wanted:
+                continue
+            query = select(model.id, owner, created).where(owner.in_({a.user_id for a in wanted}))
+            if condition is not None:
+                query = query.where(condition)
+            candidates = {}
+            for row_id, user_id, created_at in db.session.execute(query.order_by(created)):
+                candidates.setdefault(user_id, ([], []))
+                candidates[user_id][0].append(created_at)
+                candidates[user_id][1].append(row_id)
+            for activity in wanted:
+                times, ids = candidates.get(activity.user_id, ((), ()))
+                index = bisect_right(times, activity.created_at) - 1
+                if index >= 0 and activity.created_at - times[index] <= LINK_WINDOW:
+                    updates[column].append({'activity_id': activity.id, 'link': ids[index]})
+
+        for column, rows in updates.items():
+            if rows:
+                db.session.connection().execute(statement.values({column: bindparam('link')}), rows)
+                linked += len(rows)
+        db.session.commit()
+
+    return linked
+
+
+def _write_jsonl(rows):
+    """Append rows to monthly gzip-compressed JSONL files"""
+    archive_dir = get_archive_dir()
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['created_at'].strftime('%Y%m'), []).append(row)
+
+    for month, month_rows in by_month.items():
+        path = os.path.join(archive_dir, f'activities_{month}.jsonl.gz')
+        # Each append adds a new gzip member, which readers handle transparently
+        with gzip.open(path, 'at', encoding='utf-8') as fh:
+            for row in month_rows:
+                fh.write(json.dumps(dict(row, created_at=row['created_at'].isoformat())) + '\n')
+
+
+def iter_archived(user_id=None, activity_type=None, since=None, until=None):
+    """Yield archived activities as dicts from the archive table and JSONL files"""
+    query = ActivityArchive.query
+    if user_id is not None:
+        query = query.filter(ActivityArchive.user_id == user_id)
+    if activity_type:
+        query = query.filter(ActivityArchive.activity_type == activity_type)
+    if since:
+        query = query.filter(ActivityArchive.created_at >= since)
+    if until:
+        query = query.filter(ActivityArchive.created_at < until)
+
+    for row in query.order_by(ActivityArchive.created_at).yield_per(1000):
+        yield {name: getattr(row, name) for name in ARCHIVE_COLUMNS}
+
+    for path in sorted(glob.glob(os.path.join(get_archive_dir(), 'activities_*.jsonl.gz'))):
+        # Skip whole monthly files outside the requested range
+        month = datetime.strptime(os.path.basename(path)[11:17], '%Y%m')
+        if until and month >= until:
+            continue
+        if since and (month.replace(day=28) + timedelta(days=4)).replace(day=1) <= since:
+            continue
+
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            for line in fh:
+                row = json.loads(line)
+                row.setdefault('donation_id', None)
+                row.setdefault('request_id', None)
+                row['created_at'] = datetime.fromisoformat(row['created_at'])
+                if user_id is not None and row['user_id'] != user_id:
+                    continue
+                if activity_type and row['activity_type'] != activity_type:
+                    continue
+                if since and row['created_at'] < since:
+                    continue
+                if until and row['created_at'] >= until:
+                    continue
+                yield row
+
+
+@click.group('activity')
+def activity_cli():
+    """Activity retention and archive commands"""
+
+
+@activity_cli.command('archive')
+@click.option('--days', type=int, default=None, help='Retention window in days.')
+@click.option('--chunk-size', type=int, default=None, help='Rows moved per transaction.')
+@click.option('--backend', type=click.Choice(['table', 'jsonl']), default=None)
+@with_appcontext
+def archive_command(days, chunk_size, backend):
+    """Move activities older than the retention window to the archive"""
+    count = archive_activities(retention_days=days, chunk_size=chunk_size, backend=backend)
+    click.echo(f'Archived {count} activities')
+
+
+@activity_cli.command('backfill-links')
+@click.option('--chunk-size', type=int, default=None, help='Activities examined per transaction.')
+@with_appcontext
+def backfill_links_command(chunk_size):
+    """Link activities logged before deploy to their donation or request"""
+    count = backfill_activity_links(chunk_size=chunk_size)
+    click.echo(f'Linked {count} activities')
+
+
+@activity_cli.command('history')
+@click.option('--user-id', type=int, default=None)
+@click.option('--type', 'activity_type', default=None)
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None)
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None)
+@with_appcontext
+def history_command(user_id, activity_type, since, until):
+    """Print archived activities as JSON lines"""
+    for row in iter_archived(user_id=user_id, activity_type=activity_type, since=since, until=until):
+        click.echo(json.dumps(dict(row, created_at=row['created_at'].isoformat())))
@@ -0,0 +1,156 @@
+import atexit
+import os
+import queue
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+
+
+class ActivityLogger:
+    """Write-behind buffer for Activity rows.
+
+    Events are queued in memory and written by a background thread in
+    multi-row INSERT batches, either when the batch size is reached or when
+    the flush interval expires. Events that must be part of the caller's
+    transaction can still be logged synchronously.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 100
+        self.flush_interval = 2.0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('ACTIVITY_LOG_ASYNC', True)
+        self.batch_size = app.config.get('ACTIVITY_LOG_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)
+        self._queue = queue.Queue(maxsize=app.config.get('ACTIVITY_LOG_QUEUE_SIZE', 10000))
+        app.extensions['activity_logger'] = self
+        atexit.register(self.shutdown)
+
+    @property
+    def pending(self):
+        """Number of events waiting to be written"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def log(self, user_id, activity_type, description, transactional=False,
+            donation_id=None, request_id=None):
+        """Record an activity.
+
+        With ``transactional=True`` the row is added to the current session
+        and the caller must commit it, so log *before* your own commit.
+        Otherwise the event is buffered and written in the background (or,
+        when buffering is disabled, inserted and committed straight away),
+        so callers should log after their own commit.
+        """
+        from app.models import Activity, db
+
+        if transactional or not self.enabled:
+            activity = Activity(user_id=user_id, activity_type=activity_type,
+                                description=description, donation_id=donation_id,
+                                request_id=request_id)
+            db.session.add(activity)
+            if not transactional:
+                # Non-transactional callers have already committed their own work
+                db.session.commit()
+            return activity
+
+        self._ensure_started()
+        row = dict(user_id=user_id, activity_type=activity_type,
+                   description=description, created_at=datetime.utcnow(),
+                   donation_id=donation_id, request_id=request_id)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Apply backpressure instead of dropping the event
+            self.flush()
+            self._queue.put(row)
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return None
+
+    def flush(self):
+        """Write every buffered event in batches of ``batch_size``"""
+        if self._queue is None:
+            return 0
+
+        from app.models import Activity, db
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = []
+                while len(rows) < self.batch_size:
+                    try:
+                        rows.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not rows:
+                    break
+
+                with self.app.app_context():
+                    try:
+                        db.session.execute(insert(Activity), rows)
+                        db.session.commit()
+                        written += len(rows)
+                    except Exception:
+                        db.session.rollback()
+                        self.failed += len(rows)
+                        self.app.logger.exception('Failed to write %d buffered activities', len(rows))
+                    finally:
+                        db.session.remove()
+
+        self.written += written
+        return written
+
+    def shutdown(self, timeout=10):
+        """Stop the background thread and drain the buffer"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so restart in each worker process
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-logger', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+activity_logger = ActivityLogger()
+
+
+def log_activity(user_id, activity_type, description, transactional=False,
+                 donation_id=None, request_id=None):
+    """Record a user activity through the shared activity logger"""
+    return activity_logger.log(user_id, activity_type, description,
+                               transactional=transactional,
+                               donation_id=donation_id, request_id=request_id)
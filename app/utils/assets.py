@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+from app.utils.compression import brotli, preferred_encoding
+
+ASSET_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace; selectors and values are left alone"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Drop full-line comments, indentation and blank lines.
+
+    Deliberately conservative: line breaks are kept so automatic semicolon
+    insertion behaves as before, nothing is renamed, and lines inside
+    multi-line template literals are copied unchanged.
+    """
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class AssetPipeline:
+    """Fingerprinted, precompressed CSS and JS.
+
+    ``flask assets build`` minifies every stylesheet and script under the
+    static folder into ``ASSETS_BUILD_DIR`` as ``<name>.<hash>.<ext>`` with
+    ``.gz`` (and ``.br`` when brotli is installed) siblings, and writes a
+    manifest. While a manifest exists, ``url_for('static', ...)`` emits
+    the hashed names, which are served with far-future immutable caching
+    and the best precompressed sibling the client accepts. Without a
+    build the plain files are served as before.
+    """
+
+    def __init__(self, app=None):
+        self.build_dir = 'dist'
+        self.max_age = 365 * 24 * 3600
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.build_dir = app.config.get('ASSETS_BUILD_DIR', 'dist').strip('/')
+        self.max_age = app.config.get('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        self.manifest = self._load_manifest(app.static_folder)
+        app.url_defaults(self._hashed_url)
+        # More specific than the static rule, so it wins for built files
+        app.add_url_rule(f'{app.static_url_path}/{self.build_dir}/<path:filename>',
+                         endpoint='built_asset', view_func=self._serve)
+        app.extensions['assets'] = self
+
+    def build(self, static_folder, clean=False):
+        """Write minified, hashed and compressed copies plus the manifest"""
+        output = os.path.join(static_folder, self.build_dir)
+        if clean and os.path.isdir(output):
+            shutil.rmtree(output)
+
+        manifest = {}
+        results = []
+        for source in self._sources(static_folder):
+            extension = os.path.splitext(source)[1]
+            with open(os.path.join(static_folder, source), encoding='utf-8') as fh:
+                original = fh.read()
+            data = MINIFIERS[extension](original).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem = os.path.splitext(source)[0]
+            built = f'{stem}.{digest}{extension}'
+            path = os.path.join(output, built)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Old hashes are kept so pages rendered before a deploy still load
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+            with open(path + '.gz', 'wb') as fh:
+                fh.write(gzipped)
+            sizes = {'source': len(original.encode('utf-8')), 'minified': len(data), 'gzip': len(gzipped)}
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                with open(path + '.br', 'wb') as fh:
+                    fh.write(compressed)
+                sizes['br'] = len(compressed)
+
+            manifest[source] = f'{self.build_dir}/{built}'
+            results.append((source, manifest[source], sizes))
+
+        with open(os.path.join(output, MANIFEST_NAME), 'w') as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+        self.manifest = manifest
+        return results
+
+    def _sources(self, static_folder):
+        build_root = os.path.join(static_folder, self.build_dir)
+        for root, dirs, files in os.walk(static_folder):
+            if os.path.abspath(root).startswith(os.path.abspath(build_root)):
+                continue
+            for name in sorted(files):
+                if name.endswith(ASSET_EXTENSIONS) and not name.endswith(('.min.css', '.min.js')):
+                    yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+    def _load_manifest(self, static_folder):
+        path = os.path.join(static_folder, self.build_dir, MANIFEST_NAME)
+        if not os.path.isfile(path):
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def _serve(self, filename):
+        directory = os.path.join(current_app.static_folder, self.build_dir)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        available = [encoding for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+                     if os.path.isfile(os.path.join(directory, filename + suffix))]
+        encoding = preferred_encoding(request.headers.get('Accept-Encoding', ''), available)
+
+        if encoding is None:
+            response = send_from_directory(directory, filename, mimetype=mimetype, max_age=self.max_age)
+        else:
+            suffix = '.br' if encoding == 'br' else '.gz'
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=self.max_age)
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        # The name changes with the content, so browsers never need to revalidate
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+asset_pipeline = AssetPipeline()
+
+
+@click.group('assets')
+def assets_cli():
+    """Static asset commands"""
+
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help='Remove earlier builds first.')
+@with_appcontext
+def build_command(clean):
+    """Minify, fingerprint and precompress CSS and JS"""
+    for source, built, sizes in asset_pipeline.build(current_app.static_folder, clean=clean):
+        detail = ', '.join(f'{name} {size}' for name, size in sizes.items())
+        click.echo(f'{source} -> {built} ({detail} bytes)')
+    if brotli is None:
+        click.echo('brotli is not installed; only .gz files were written')
+    click.echo('Restart the app to pick up the new manifest')
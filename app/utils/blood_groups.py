@@ -0,0 +1,13 @@
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+# Donor/recipient compatibility for red cell transfusion
+COMPATIBILITY_DATA = {
+    'A+': {'can_donate_to': ['A+', 'AB+'], 'can_receive_from': ['A+', 'A-', 'O+', 'O-']},
+    'A-': {'can_donate_to': ['A+', 'A-', 'AB+', 'AB-'], 'can_receive_from': ['A-', 'O-']},
+    'B+': {'can_donate_to': ['B+', 'AB+'], 'can_receive_from': ['B+', 'B-', 'O+', 'O-']},
+    'B-': {'can_donate_to': ['B+', 'B-', 'AB+', 'AB-'], 'can_receive_from': ['B-', 'O-']},
+    'AB+': {'can_donate_to': ['AB+'], 'can_receive_from': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']},
+    'AB-': {'can_donate_to': ['AB+', 'AB-'], 'can_receive_from': ['A-', 'B-', 'AB-', 'O-']},
+    'O+': {'can_donate_to': ['A+', 'B+', 'AB+', 'O+'], 'can_receive_from': ['O+', 'O-']},
+    'O-': {'can_donate_to': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'], 'can_receive_from': ['O-']},
+}
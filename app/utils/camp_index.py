@@ -0,0 +1,184 @@
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import func, update
+
+from app.models import BloodCamp, User, State, City, db
+
+
+def _camp_entry(camp_id, name, address, contact_number, start_date, end_date,
+                host_id, host_name, state, city):
+    return {
+        'id': camp_id,
+        'name': name,
+        'address': address,
+        'contact_number': contact_number,
+        'start_date': start_date,
+        'end_date': end_date,
+        'host_id': host_id,
+        'host_name': host_name,
+        'state': state,
+        'city': city
+    }
+
+
+class ActiveCampIndex:
+    """Camps running today, grouped by (state_id, city_id).
+
+    The date-range query runs only when the index is rebuilt: on the first
+    lookup of a new day, after ``ttl`` seconds (so other workers' edits
+    show up), or from the midnight job. ``manage_camps`` applies its own
+    edits with ``refresh_camp`` so this worker never serves a stale list.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.built_for = None
+        self.built_at = 0.0
+        self.rebuilds = 0
+        self._cities = {}
+        self._locations = {}
+        self._lock = threading.RLock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CAMP_INDEX_TTL', 300)
+        app.extensions['camp_index'] = self
+
+    def rebuild(self, today=None):
+        """Reload today's camps; returns the city keys whose lists changed"""
+        today = today or date.today()
+        rows = db.session.query(
+            BloodCamp.id,
+            BloodCamp.name,
+            BloodCamp.address,
+            BloodCamp.contact_number,
+            BloodCamp.start_date,
+            BloodCamp.end_date,
+            BloodCamp.host_id,
+            BloodCamp.state_id,
+            BloodCamp.city_id,
+            User.name.label('host_name'),
+            State.name.label('state'),
+            City.name.label('city')
+        ).join(User, BloodCamp.host_id == User.id)\
+         .join(State, BloodCamp.state_id == State.id)\
+         .join(City, BloodCamp.city_id == City.id)\
+         .filter(BloodCamp.is_active == True,
+                 BloodCamp.start_date <= today,
+                 BloodCamp.end_date >= today)\
+         .order_by(BloodCamp.start_date, BloodCamp.id).all()
+
+        cities = {}
+        locations = {}
+        for row in rows:
+            key = (row.state_id, row.city_id)
+            cities.setdefault(key, []).append(_camp_entry(
+                row.id, row.name, row.address, row.contact_number, row.start_date,
+                row.end_date, row.host_id, row.host_name, row.state, row.city))
+            locations[row.id] = key
+
+        with self._lock:
+            changed = {key for key in set(self._cities) | set(cities)
+                       if self._cities.get(key) != cities.get(key)}
+            self._cities = cities
+            self._locations = locations
+            self.built_for = today
+            self.built_at = time.monotonic()
+            self.rebuilds += 1
+        return changed
+
+    def camps_for_city(self, state_id, city_id):
+        """Camps running today in one city, soonest first"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._cities.get((state_id, city_id), ()))
+
+    def camp_ids_for_host(self, host_id):
+        """Ids of a host's camps that are running today"""
+        self._ensure_fresh()
+        with self._lock:
+            return {camp['id'] for camps in self._cities.values()
+                    for camp in camps if camp['host_id'] == host_id}
+
+    def refresh_camp(self, camp):
+        """Apply a created, updated or deactivated camp to the index"""
+        with self._lock:
+            if self.built_for is None:
+                return
+            self._remove(camp.id)
+            today = self.built_for
+            if camp.is_active and camp.start_date <= today <= camp.end_date:
+                key = (camp.state_id, camp.city_id)
+                camps = self._cities.setdefault(key, [])
+                camps.append(_camp_entry(
+                    camp.id, camp.name, camp.address, camp.contact_number, camp.start_date,
+                    camp.end_date, camp.host_id, camp.host.name, camp.state.name, camp.city.name))
+                camps.sort(key=lambda entry: (entry['start_date'], entry['id']))
+                self._locations[camp.id] = key
+
+    def stats(self):
+        with self._lock:
+            return {
+                'built_for': self.built_for.isoformat() if self.built_for else None,
+                'cities': len(self._cities),
+                'camps': len(self._locations),
+                'rebuilds': self.rebuilds
+            }
+
+    def _remove(self, camp_id):
+        key = self._locations.pop(camp_id, None)
+        if key is None:
+            return
+        camps = [entry for entry in self._cities.get(key, ()) if entry['id'] != camp_id]
+        if camps:
+            self._cities[key] = camps
+        else:
+            self._cities.pop(key, None)
+
+    def _ensure_fresh(self):
+        if self.built_for == date.today() and time.monotonic() - self.built_at < self.ttl:
+            return
+        with self._lock:
+            if self.built_for != date.today() or time.monotonic() - self.built_at >= self.ttl:
+                self.rebuild()
+
+
+camp_index = ActiveCampIndex()
+
+
+def expire_camps(today=None):
+    """Deactivate every camp whose end date has passed with one UPDATE"""
+    from app.utils.change_feed import publish_change
+
+    today = today or date.today()
+    expired = db.session.query(BloodCamp.host_id, func.count(BloodCamp.id))\
+                        .filter(BloodCamp.is_active == True, BloodCamp.end_date < today)\
+                        .group_by(BloodCamp.host_id).all()
+    if not expired:
+        return 0
+
+    db.session.execute(
+        update(BloodCamp)
+        .where(BloodCamp.is_active == True, BloodCamp.end_date < today)
+        .values(is_active=False)
+    )
+    db.session.commit()
+
+    total = 0
+    for host_id, count in expired:
+        publish_change(f'host:{host_id}', 'camps_expired', counters={'active_camps': -count})
+        total += count
+    publish_change('admin', 'camps_expired', counters={'active_camps': -total})
+    return total
+
+
+def daily_camp_maintenance():
+    """Midnight job: expire finished camps, then rebuild today's index"""
+    from app.utils.response_cache import invalidate_city
+
+    expire_camps()
+    for state_id, city_id in camp_index.rebuild():
+        invalidate_city(state_id, city_id)
@@ -8,18 +8,14 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.colors import HexColor
 from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.graphics import renderPDF
-from flask import current_app
+from app.utils.storage import generated_storage
 
 def generate_donation_certificate(donation, donor_name, hospital_name=None, camp_name=None):
     """Generate a PDF certificate for blood donation"""
     
-    # Create certificates directory if it doesn't exist
-    cert_dir = os.path.join(current_app.root_path, 'static', 'certificates')
-    os.makedirs(cert_dir, exist_ok=True)
-    
-    # Generate filename
-    filename = f"donation_certificate_{donation.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    filepath = os.path.join(cert_dir, filename)
+    # Generate filename in private storage
+    filename = generated_storage.new_filename(f'donation_certificate_{donation.id}', 'pdf')
+    filepath = generated_storage.path('certificates', filename)
     
     # Create PDF document
     doc = SimpleDocTemplate(filepath, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
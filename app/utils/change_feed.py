@@ -0,0 +1,110 @@
+import json
+import queue
+import threading
+import time
+
+from flask import Response, current_app, stream_with_context
+
+
+class ChangeFeed:
+    """In-process publish/subscribe hub feeding the dashboard event streams.
+
+    Write routes publish small deltas after they commit; every connected
+    dashboard subscribed to the channel receives them without re-running
+    its COUNT queries. Channels are named ``hospital:<id>``, ``host:<id>``
+    and ``admin``.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, channel):
+        """Register a new listener queue for a channel"""
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            listeners = self._subscribers.get(channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(listeners) for listeners in self._subscribers.values())
+
+    def publish(self, channel, event, counters=None, item=None):
+        """Push a delta to every listener on a channel.
+
+        ``counters`` maps dashboard counter names to signed deltas and
+        ``item`` carries an optional row for the dashboard's recent list.
+        """
+        message = {'event': event, 'counters': counters or {}, 'item': item}
+        with self._lock:
+            listeners = list(self._subscribers.get(channel, ()))
+        for subscription in listeners:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A slow client missed deltas, so ask it to reload instead
+                _drain(subscription)
+                subscription.put_nowait({'event': 'resync', 'counters': {}, 'item': None})
+        self.published += 1
+
+    def stream(self, channel, heartbeat=15, max_duration=300):
+        """Yield Server-Sent Events for a channel until the client goes away"""
+        subscription = self.subscribe(channel)
+        deadline = time.monotonic() + max_duration
+        try:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                try:
+                    message = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'data: {json.dumps(message)}\n\n'
+        finally:
+            self.unsubscribe(channel, subscription)
+
+
+def _drain(subscription):
+    while True:
+        try:
+            subscription.get_nowait()
+        except queue.Empty:
+            return
+
+
+change_feed = ChangeFeed()
+
+
+def publish_change(channel, event, counters=None, item=None):
+    """Publish a committed change to dashboard listeners"""
+    change_feed.publish(channel, event, counters=counters, item=item)
+
+
+def event_stream_response(channel):
+    """Build a streaming text/event-stream response for a channel"""
+    from app.models import db
+
+    # Release the pooled connection before the long-lived stream starts
+    db.session.close()
+
+    config = current_app.config
+    stream = change_feed.stream(channel,
+                                heartbeat=config.get('SSE_HEARTBEAT_INTERVAL', 15),
+                                max_duration=config.get('SSE_MAX_DURATION', 300))
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
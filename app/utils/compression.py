@@ -0,0 +1,253 @@
+import threading
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without the brotli package
+    brotli = None
+
+DEFAULT_MIMETYPES = ('text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+                     'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+# Known-length bodies above this are compressed chunk by chunk instead of in memory
+BUFFER_LIMIT = 1024 * 1024
+_SKIP_STATUSES = (204, 206, 304)
+
+
+def preferred_encoding(accept_encoding, encodings):
+    """First of ``encodings`` that an Accept-Encoding header allows, else None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get('*', 0)
+    for encoding in encodings:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class ResponseCompressor:
+    """Gzip/Brotli compression of dynamic responses as WSGI middleware.
+
+    Sitting outside Flask, it sees the final bytes, so the page cache and
+    conditional responses keep working on uncompressed bodies. Only
+    allowlisted content types at or above ``COMPRESS_MIN_SIZE`` are
+    compressed; event streams, already encoded bodies, ``no-transform``
+    responses and empty offloaded downloads pass through untouched;
+    generated files served by the WSGI server are marked ``no-transform``
+    so they keep their zero-copy path.
+    Bodies without a Content-Length (streamed CSV exports and the like)
+    are compressed as they are produced, flushing after every chunk.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.min_size = 500
+        self.level = 6
+        self.brotli_quality = 4
+        self.mimetypes = frozenset(DEFAULT_MIMETYPES)
+        self._lock = threading.Lock()
+        self.responses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+        self.mimetypes = frozenset(app.config.get('COMPRESS_MIMETYPES') or DEFAULT_MIMETYPES)
+        if self.enabled:
+            app.wsgi_app = _CompressionMiddleware(app.wsgi_app, self)
+        app.extensions['response_compressor'] = self
+
+    def choose_encoding(self, accept_encoding):
+        """Best encoding the client accepts: br, then gzip, else None"""
+        return preferred_encoding(accept_encoding, ('br', 'gzip') if brotli is not None else ('gzip',))
+
+    def should_compress(self, status, headers):
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in _SKIP_STATUSES:
+            return False
+        content_type = content_encoding = cache_control = content_length = None
+        for name, value in headers:
+            name = name.lower()
+            if name == 'content-type':
+                content_type = value.split(';', 1)[0].strip().lower()
+            elif name == 'content-encoding':
+                content_encoding = value
+            elif name == 'cache-control':
+                cache_control = value.lower()
+            elif name == 'content-length':
+                content_length = int(value)
+        if content_encoding or content_type not in self.mimetypes or content_type == 'text/event-stream':
+            return False
+        if cache_control and 'no-transform' in cache_control:
+            return False
+        return content_length is None or content_length >= self.min_size
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        # wbits 16+ writes a gzip header and trailer
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'responses': dict(self.responses),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'cpu_seconds': self.cpu_seconds
+            }
+
+
+class _BrotliCompressor:
+    """zlib-style interface over ``brotli.Compressor``"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self, mode=zlib.Z_FINISH):
+        if mode == zlib.Z_FINISH:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class _CompressionMiddleware:
+    def __init__(self, wsgi_app, compressor):
+        self.wsgi_app = wsgi_app
+        self.compressor = compressor
+
+    def __call__(self, environ, start_response):
+        encoding = self.compressor.choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        captured = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            # The legacy write() callable is never used by Flask
+            return None
+
+        # Werkzeug responses call start_response before returning the body
+        app_iter = self.wsgi_app(environ, capture)
+        status, headers, exc_info = captured
+        if not self.compressor.should_compress(status, headers):
+            start_response(status, headers, exc_info)
+            return app_iter
+
+        length = next((int(value) for name, value in headers if name.lower() == 'content-length'), None)
+        headers = _compressed_headers(headers, encoding)
+        if length is not None and length <= BUFFER_LIMIT:
+            body = self._compress_all(app_iter, encoding)
+            headers.append(('Content-Length', str(len(body))))
+            start_response(status, headers, exc_info)
+            return [body]
+
+        start_response(status, headers, exc_info)
+        return self._compress_stream(app_iter, encoding, flush_each=length is None)
+
+    def _compress_all(self, app_iter, encoding):
+        started = time.thread_time()
+        compressor = self.compressor.compressor(encoding)
+        size = 0
+        parts = []
+        try:
+            for chunk in app_iter:
+                size += len(chunk)
+                parts.append(compressor.compress(chunk))
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        parts.append(compressor.flush())
+        body = b''.join(parts)
+        self.compressor.record(encoding, size, len(body), time.thread_time() - started)
+        return body
+
+    def _compress_stream(self, app_iter, encoding, flush_each):
+        compressor = self.compressor.compressor(encoding)
+        size = written = 0
+        cpu = 0.0
+        try:
+            for chunk in app_iter:
+                started = time.thread_time()
+                size += len(chunk)
+                data = compressor.compress(chunk)
+                if flush_each:
+                    # Push each chunk out so streamed exports arrive progressively
+                    data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                cpu += time.thread_time() - started
+                if data:
+                    written += len(data)
+                    yield data
+            started = time.thread_time()
+            data = compressor.flush()
+            cpu += time.thread_time() - started
+            written += len(data)
+            yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            self.compressor.record(encoding, size, written, cpu)
+
+
+def _compressed_headers(headers, encoding):
+    result = []
+    vary = None
+    for name, value in headers:
+        lower = name.lower()
+        if lower in ('content-length', 'accept-ranges', 'content-md5'):
+            continue
+        if lower == 'etag' and not value.startswith('W/'):
+            # The compressed body is a different representation
+            value = 'W/' + value
+        if lower == 'vary':
+            vary = value
+            continue
+        result.append((name, value))
+    if vary is None:
+        vary = 'Accept-Encoding'
+    elif 'accept-encoding' not in vary.lower() and vary.strip() != '*':
+        vary = f'{vary}, Accept-Encoding'
+    result.append(('Vary', vary))
+    result.append(('Content-Encoding', encoding))
+    return result
+
+
+response_compressor = ResponseCompressor()
+
+
+def collect_compression_stats():
+    """Counters for bytes saved and CPU spent compressing"""
+    stats = response_compressor.stats()
+    return [
+        ('bbms_compression_responses_total', 'Responses compressed.', 'counter',
+         sum(stats['responses'].values())),
+        ('bbms_compression_bytes_in_total', 'Bytes before compression.', 'counter', stats['bytes_in']),
+        ('bbms_compression_bytes_out_total', 'Bytes after compression.', 'counter', stats['bytes_out']),
+        ('bbms_compression_cpu_seconds_total', 'Thread CPU time spent compressing.', 'counter',
+         round(stats['cpu_seconds'], 6)),
+    ]
@@ -0,0 +1,120 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+DB_PROFILES = ('mysql', 'sqlite', 'test')
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    metrics_label = 'default'
+
+    def _do_get(self):
+        from app.utils.metrics import metrics, WAIT_BUCKETS
+
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.increment(metrics.pool_timeouts, self.metrics_label)
+            raise
+        finally:
+            metrics.observe(metrics.pool_wait, self.metrics_label,
+                            time.perf_counter() - started, WAIT_BUCKETS)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+def resolve_profile(config):
+    """DB_PROFILE, or the profile implied by the database URL"""
+    profile = config.get('DB_PROFILE')
+    if profile:
+        if profile not in DB_PROFILES:
+            raise ValueError(f'Unknown DB_PROFILE {profile!r}; use one of {DB_PROFILES}')
+        return profile
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    return 'sqlite' if backend == 'sqlite' else 'mysql'
+
+
+def engine_options(config, url=None):
+    """Engine keyword arguments for the configured profile"""
+    url = make_url(url or config['SQLALCHEMY_DATABASE_URI'])
+    profile = resolve_profile(config)
+    in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+    if profile == 'test' or in_memory:
+        # Flask-SQLAlchemy gives in-memory SQLite a StaticPool of its own
+        options = {} if in_memory else {'poolclass': TimedQueuePool, 'pool_size': 2,
+                                        'max_overflow': 2, 'pool_timeout': 5}
+    elif profile == 'sqlite':
+        options = {
+            'poolclass': TimedQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+            'connect_args': {'timeout': config.get('DB_SQLITE_BUSY_TIMEOUT', 15),
+                             'check_same_thread': False},
+        }
+    else:
+        options = {
+            'poolclass': TimedQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+            # Recycle well inside MySQL's wait_timeout and ping before reuse
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+            'connect_args': {'connect_timeout': config.get('DB_CONNECT_TIMEOUT', 10)},
+        }
+
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS still win
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def configure_engine(app):
+    """Apply the engine profile; call before ``db.init_app``"""
+    app.config['DB_PROFILE'] = resolve_profile(app.config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def install_engine_hooks(app, db):
+    """Label pools for metrics and set SQLite pragmas; call after ``db.init_app``"""
+    busy_timeout_ms = int(app.config.get('DB_SQLITE_BUSY_TIMEOUT', 15) * 1000)
+    with app.app_context():
+        for key, engine in db.engines.items():
+            engine.pool.metrics_label = key or 'default'
+            if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+                event.listen(engine, 'connect', _sqlite_pragmas(busy_timeout_ms))
+
+
+def _sqlite_pragmas(busy_timeout_ms):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a writer commits
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+        cursor.close()
+    return set_pragmas
+
+
+def collect_pool_stats():
+    """Gauges for the default engine's connection pool"""
+    from app import db
+
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        ('bbms_db_pool_size', 'Configured pool size.', 'gauge', pool.size()),
+        ('bbms_db_pool_checked_out', 'Connections currently checked out.', 'gauge', pool.checkedout()),
+        ('bbms_db_pool_overflow', 'Connections open beyond the pool size.', 'gauge', max(pool.overflow(), 0)),
+    ]
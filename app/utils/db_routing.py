@@ -0,0 +1,134 @@
+import random
+import sqlite3
+import time
+
+import click
+from flask import current_app, g, has_request_context, request, session
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.selectable import CompoundSelect, Select
+
+REPLICA_BIND_PREFIX = 'replica_'
+_PRIMARY_UNTIL = '_db_primary_until'
+
+
+def read_only(view):
+    """Mark a view whose GET requests may be served from a read replica"""
+    view._read_only = True
+    return view
+
+
+def use_primary():
+    """Send the rest of this request's queries to the primary"""
+    if has_request_context():
+        g._db_replica = None
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs from read-only requests to a replica.
+
+    Writes, flushes and locking reads always use the primary. Once the
+    request writes anything it stays on the primary, and the user's
+    following requests do too for ``REPLICA_STICKY_SECONDS`` so a
+    redirect after a write reads its own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_plain_select(clause) and has_request_context():
+            key = g.get('_db_replica')
+            if key is not None:
+                engine = self._db.engines.get(key)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_plain_select(clause):
+    if isinstance(clause, CompoundSelect):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(db_session, flush_context):
+    _mark_write(db_session)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        _mark_write(orm_execute_state.session)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(db_session):
+    if db_session.info.pop('wrote', False) and has_request_context() and replica_keys():
+        sticky = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        session[_PRIMARY_UNTIL] = time.time() + sticky
+
+
+def _mark_write(db_session):
+    db_session.info['wrote'] = True
+    use_primary()
+
+
+def replica_keys():
+    """Bind keys of the configured replicas"""
+    return [key for key in current_app.config.get('SQLALCHEMY_BINDS', {})
+            if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+
+
+def configure_replicas(app):
+    """Add one bind per replica URL; call before ``db.init_app``"""
+    from app.utils.db_engine import engine_options
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for index, url in enumerate(app.config.get('DATABASE_REPLICA_URLS') or []):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = dict(engine_options(app.config, url), url=url)
+    if any(key.startswith(REPLICA_BIND_PREFIX) for key in binds if isinstance(key, str)):
+        app.before_request(_choose_bind)
+
+
+def _choose_bind():
+    g._db_replica = None
+    if request.method not in ('GET', 'HEAD'):
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, '_read_only', False):
+        return
+    if session.get(_PRIMARY_UNTIL, 0) > time.time():
+        return
+    g._db_replica = random.choice(replica_keys())
+
+
+@click.group('replica')
+def replica_cli():
+    """Read replica helpers"""
+
+
+@replica_cli.command('sync')
+@with_appcontext
+def sync_replicas():
+    """Copy a SQLite primary into SQLite replica files (local testing only)"""
+    from app.models import db
+
+    primary = db.engine.url
+    if primary.get_backend_name() != 'sqlite':
+        raise click.ClickException('sync only copies SQLite databases; use MySQL replication otherwise')
+    keys = replica_keys()
+    if not keys:
+        raise click.ClickException('No replicas configured; set DATABASE_REPLICA_URLS')
+
+    source = sqlite3.connect(primary.database)
+    try:
+        for key in keys:
+            replica = db.engines[key].url
+            target = sqlite3.connect(replica.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            click.echo(f'Copied {primary.database} to {replica.database}')
+    finally:
+        source.close()
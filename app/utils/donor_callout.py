@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, or_, select, update
+
+from app.models import BloodDonation, User, db
+from app.utils.blood_groups import COMPATIBILITY_DATA
+
+CALLOUT_COLUMNS = (User.id, User.name, User.email, User.age, User.blood_group,
+                   User.last_donation_date, User.lifetime_units)
+
+
+def eligibility_cutoff(today=None):
+    """Latest last-donation date that still allows donating today"""
+    days = current_app.config.get('DONOR_DEFERRAL_DAYS', 90)
+    return (today or date.today()) - timedelta(days=days)
+
+
+def eligible_donors(city_id, blood_group, limit=None, today=None):
+    """Ranked donors in a city who can give ``blood_group`` blood today.
+
+    Served from the denormalized donor columns through
+    ``ix_user_donor_callout``, so no donations are aggregated. Exact group
+    matches come first, then proven donors by lifetime units, then those
+    who have rested longest.
+    """
+    limit = limit or current_app.config.get('DONOR_CALLOUT_LIMIT', 50)
+    groups = COMPATIBILITY_DATA[blood_group]['can_receive_from']
+    query = (
+        select(*CALLOUT_COLUMNS)
+        .where(User.city_id == city_id,
+               User.blood_group.in_(groups),
+               or_(User.last_donation_date == None, User.last_donation_date <= eligibility_cutoff(today)),
+               User.role == 'patient',
+               User.is_approved == True)
+        .order_by(case((User.blood_group == blood_group, 0), else_=1),
+                  User.lifetime_units.desc(),
+                  User.last_donation_date,
+                  User.id)
+        .limit(limit)
+    )
+    return db.session.execute(query).mappings().all()
+
+
+def record_approved_donation(donation):
+    """Fold an approved donation into its donor's history; commit with the approval"""
+    donated_on = donation.donation_date
+    db.session.execute(
+        update(User)
+        .where(User.id == donation.donor_id)
+        .values(lifetime_units=User.lifetime_units + donation.units_donated,
+                last_donation_date=case(
+                    (or_(User.last_donation_date == None, User.last_donation_date < donated_on), donated_on),
+                    else_=User.last_donation_date))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_donor_history(chunk_size=1000):
+    """Recompute donor history from approved donations in id-ordered chunks"""
+    updated = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        totals = {
+            row.donor_id: row for row in db.session.execute(
+                select(BloodDonation.donor_id,
+                       func.max(BloodDonation.donation_date).label('last_donation_date'),
+                       func.coalesce(func.sum(BloodDonation.units_donated), 0).label('lifetime_units'))
+                .where(BloodDonation.donor_id.in_(ids), BloodDonation.status == 'approved')
+                .group_by(BloodDonation.donor_id)
+            )
+        }
+        db.session.execute(update(User), [
+            {'id': user_id,
+             'last_donation_date': totals[user_id].last_donation_date if user_id in totals else None,
+             'lifetime_units': totals[user_id].lifetime_units if user_id in totals else 0}
+            for user_id in ids
+        ])
+        db.session.commit()
+
+        updated += len(ids)
+        last_id = ids[-1]
+
+    return updated
+
+
+@click.group('donors')
+def donor_cli():
+    """Donor history commands"""
+
+
+@donor_cli.command('backfill')
+@click.option('--chunk-size', type=int, default=1000, help='Users updated per transaction.')
+@with_appcontext
+def backfill_command(chunk_size):
+    """Rebuild last donation dates and lifetime units from approved donations"""
+    count = backfill_donor_history(chunk_size=chunk_size)
+    click.echo(f'Backfilled donor history for {count} users')
@@ -0,0 +1,51 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import current_app, send_file
+
+from app.utils.storage import generated_storage
+
+FILE_SERVING_BACKENDS = ('wsgi', 'x-accel', 'x-sendfile')
+
+
+def send_generated_file(kind, filename, download_name):
+    """Serve a generated report or certificate as an attachment.
+
+    ``FILE_SERVING_BACKEND`` picks who moves the bytes:
+
+    * ``x-accel``: nginx serves ``FILE_SERVING_X_ACCEL_PREFIX/<kind>/<file>``
+      from an ``internal`` location aliased to the generated files directory.
+    * ``x-sendfile``: Apache mod_xsendfile (or lighttpd) serves the absolute
+      path given in ``X-Sendfile``.
+    * ``wsgi``: ``send_file`` hands the open file to the server's
+      ``wsgi.file_wrapper``, which gunicorn and uWSGI implement with
+      ``sendfile(2)``.
+
+    The view only checks access and builds headers, so a slow client never
+    holds a worker for the length of the transfer with the first two.
+    """
+    path = generated_storage.path(kind, filename)
+    backend = current_app.config.get('FILE_SERVING_BACKEND', 'wsgi')
+
+    if backend == 'wsgi':
+        response = send_file(path, as_attachment=True, download_name=download_name, conditional=True)
+        # Keeps the compression middleware (and proxies) off the file so the
+        # server can still send it with sendfile(2) instead of buffering it
+        response.cache_control.no_transform = True
+        return response
+
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['Content-Disposition'] = \
+        f"attachment; filename*=UTF-8''{quote(download_name)}"
+    if backend == 'x-accel':
+        prefix = current_app.config.get('FILE_SERVING_X_ACCEL_PREFIX', '/_protected').rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{kind}/{quote(filename)}'
+    elif backend == 'x-sendfile':
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    else:
+        raise ValueError(f'Unknown FILE_SERVING_BACKEND {backend!r}; use one of {FILE_SERVING_BACKENDS}')
+    # Generated files are private to the requesting user
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
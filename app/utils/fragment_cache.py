@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """Bounded in-memory LRU of rendered template fragments.
+
+    Templates wrap expensive sections in ``{% cache key, ttl %}`` ...
+    ``{% endcache %}``. The key is combined with the template name and the
+    tag's line, so the same row key can be reused by several blocks. Keys
+    should carry a row version, e.g. ``[user.id, user.updated_at]``: an
+    update then produces a new key and the stale fragment simply ages out
+    of the LRU. The TTL (``FRAGMENT_CACHE_DEFAULT_TTL`` when omitted)
+    bounds anything the key does not capture. Fragments must not contain
+    per-viewer output such as CSRF tokens.
+
+    Compiled templates are also written to a Jinja bytecode cache on disk
+    so new workers load them without recompiling.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_entries = 10000
+        self.max_bytes = 16 * 1024 * 1024
+        self.default_ttl = 300
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 10000)
+        self.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        self.default_ttl = app.config.get('FRAGMENT_CACHE_DEFAULT_TTL', 300)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+
+        if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+            directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR') or \
+                os.path.join(app.instance_path, 'jinja_cache')
+            os.makedirs(directory, exist_ok=True)
+            # Entries are keyed by template name and source checksum, so edits recompile
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        app.extensions['fragment_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class FragmentCacheExtension(Extension):
+    """The ``{% cache key[, ttl] %}`` ... ``{% endcache %}`` tag"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(f'{parser.name}:{lineno}'), parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, block, key, ttl, caller):
+        cache = getattr(self.environment, 'fragment_cache', None)
+        if cache is None or not cache.enabled:
+            return caller()
+        key = (block, tuple(key) if isinstance(key, (list, tuple)) else key)
+        fragment = cache.get(key)
+        if fragment is None:
+            # Markup from the caller is stored as-is so autoescaping stays correct
+            fragment = caller()
+            cache.set(key, fragment, ttl)
+        return fragment
+
+
+fragment_cache = FragmentCache()
+
+
+def collect_fragment_cache_stats():
+    """Hit rate and size of the template fragment cache"""
+    stats = fragment_cache.stats()
+    return [
+        ('bbms_fragment_cache_hits_total', 'Template fragment cache hits.', 'counter', stats['hits']),
+        ('bbms_fragment_cache_misses_total', 'Template fragment cache misses.', 'counter', stats['misses']),
+        ('bbms_fragment_cache_evictions_total', 'Fragments evicted to stay within limits.', 'counter',
+         stats['evictions']),
+        ('bbms_fragment_cache_entries', 'Cached template fragments.', 'gauge', stats['entries']),
+        ('bbms_fragment_cache_bytes', 'Characters held by the fragment cache.', 'gauge', stats['bytes']),
+    ]
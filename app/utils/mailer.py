@@ -0,0 +1,197 @@
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import click
+from flask import current_app, render_template
+from flask.cli import with_appcontext
+from sqlalchemy import delete
+
+from app.models import EmailOutbox, db
+
+
+def queue_email(recipient, subject, template, **context):
+    """Add a rendered email to the outbox; it is sent only if the caller commits"""
+    db.session.add(EmailOutbox(recipient=recipient, subject=subject,
+                               body=render_template(template, **context)))
+
+
+def notify_request_decision(blood_request):
+    """Tell the patient their blood request was approved or rejected"""
+    queue_email(blood_request.patient.email,
+                f'Your blood request has been {blood_request.status}',
+                'email/request_decision.txt', blood_request=blood_request)
+
+
+def notify_donation_approved(donation):
+    """Tell the donor their donation was approved and the certificate is ready"""
+    queue_email(donation.donor.email, 'Your donation certificate is ready',
+                'email/donation_approved.txt', donation=donation)
+
+
+def notify_account_approved(user):
+    """Tell a hospital or camp host their account can now sign in"""
+    queue_email(user.email, 'Your account has been approved',
+                'email/account_approved.txt', user=user)
+
+
+class OutboxSender:
+    """Drains the email outbox over one reused SMTP connection.
+
+    Runs as a scheduled job, so web requests never talk to SMTP. Due rows
+    are sent in id-ordered batches, each committed on its own. A message
+    the server refuses is retried with exponential backoff until
+    ``OUTBOX_MAX_ATTEMPTS`` (5xx replies fail it at once); a dropped
+    connection defers the rest of the batch to the next run.
+    """
+
+    def __init__(self, app=None):
+        self.batch_size = 50
+        self.max_attempts = 6
+        self.backoff = 60
+        self.max_backoff = 6 * 3600
+        self.retention_days = 30
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('OUTBOX_BATCH_SIZE', 50)
+        self.max_attempts = app.config.get('OUTBOX_MAX_ATTEMPTS', 6)
+        self.backoff = app.config.get('OUTBOX_BACKOFF_SECONDS', 60)
+        self.max_backoff = app.config.get('OUTBOX_MAX_BACKOFF_SECONDS', 6 * 3600)
+        self.retention_days = app.config.get('OUTBOX_RETENTION_DAYS', 30)
+        app.extensions['outbox_sender'] = self
+
+    def send_pending(self):
+        """Send every due message; returns how many were delivered"""
+        if not current_app.config.get('MAIL_SERVER'):
+            current_app.logger.debug('MAIL_SERVER is not set; leaving the outbox queued')
+            return 0
+
+        delivered = 0
+        connection = None
+        try:
+            while True:
+                now = datetime.utcnow()
+                batch = EmailOutbox.query.filter(EmailOutbox.status == 'pending',
+                                                 EmailOutbox.next_attempt_at <= now)\
+                                         .order_by(EmailOutbox.id)\
+                                         .limit(self.batch_size).all()
+                if not batch:
+                    break
+
+                try:
+                    connection = connection or self._connect()
+                except (smtplib.SMTPException, OSError) as exc:
+                    current_app.logger.warning('Could not connect to %s: %s',
+                                               current_app.config['MAIL_SERVER'], exc)
+                    self._defer(batch, exc, now)
+                    db.session.commit()
+                    break
+
+                dropped = False
+                for index, message in enumerate(batch):
+                    try:
+                        connection.send_message(self._build(message))
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                            smtplib.SMTPDataError) as exc:
+                        self._defer([message], exc, now)
+                    except (smtplib.SMTPException, OSError) as exc:
+                        self._defer(batch[index:], exc, now)
+                        dropped = True
+                        break
+                    else:
+                        message.status = 'sent'
+                        message.attempts += 1
+                        message.sent_at = now
+                        delivered += 1
+                db.session.commit()
+                if dropped:
+                    connection = None
+                    break
+        finally:
+            if connection is not None:
+                try:
+                    connection.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+
+        with self._lock:
+            self.sent += delivered
+        self._purge_sent()
+        return delivered
+
+    def stats(self):
+        with self._lock:
+            return {'sent': self.sent, 'retried': self.retried, 'failed': self.failed}
+
+    def _connect(self):
+        config = current_app.config
+        connection = smtplib.SMTP(config['MAIL_SERVER'], config.get('MAIL_PORT', 587),
+                                  timeout=config.get('MAIL_TIMEOUT', 30))
+        if config.get('MAIL_USE_TLS'):
+            connection.starttls()
+        if config.get('MAIL_USERNAME'):
+            connection.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD') or '')
+        return connection
+
+    def _build(self, message):
+        config = current_app.config
+        email = EmailMessage()
+        email['From'] = config.get('MAIL_DEFAULT_SENDER') or config.get('MAIL_USERNAME') or 'no-reply@localhost'
+        email['To'] = message.recipient
+        email['Subject'] = message.subject
+        email['Message-ID'] = f'<outbox-{message.id}@{config["MAIL_SERVER"]}>'
+        email.set_content(message.body)
+        return email
+
+    def _defer(self, messages, error, now):
+        """Schedule a retry, or give up after the last attempt or a permanent refusal"""
+        permanent = isinstance(error, smtplib.SMTPRecipientsRefused) or \
+            getattr(error, 'smtp_code', 0) >= 500
+        retried = failed = 0
+        for message in messages:
+            message.attempts += 1
+            message.last_error = repr(error)[:1000]
+            if permanent or message.attempts >= self.max_attempts:
+                message.status = 'failed'
+                failed += 1
+            else:
+                delay = min(self.backoff * 2 ** (message.attempts - 1), self.max_backoff)
+                message.next_attempt_at = now + timedelta(seconds=delay)
+                retried += 1
+        with self._lock:
+            self.retried += retried
+            self.failed += failed
+
+    def _purge_sent(self):
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        db.session.execute(delete(EmailOutbox).where(EmailOutbox.status == 'sent',
+                                                     EmailOutbox.sent_at < cutoff))
+        db.session.commit()
+
+
+outbox_sender = OutboxSender()
+
+
+def send_outbox():
+    """Scheduled job wrapper for the outbox sender"""
+    return outbox_sender.send_pending()
+
+
+@click.group('mail')
+def mail_cli():
+    """Notification email commands"""
+
+
+@mail_cli.command('send')
+@with_appcontext
+def send_command():
+    """Send due outbox messages now (e.g. to a local debugging SMTP server)"""
+    count = outbox_sender.send_pending()
+    click.echo(f'Sent {count} emails')
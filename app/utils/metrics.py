@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+RESPONSE_BUCKETS = (300, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, 604800)
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus cumulative style"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-endpoint request, database and template timings.
+
+    Request hooks and SQLAlchemy/Jinja listeners only take timestamps and
+    update dicts; the Prometheus text is built on demand by ``render()``.
+    ``benchmarks.instrumentation`` measures the cost: on SQLite the request
+    hooks disappear in the noise, while the cursor listeners (with the slow
+    query log's) add about 20 microseconds to every statement. Other components can
+    add gauges with ``register_collector``.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.request_latency = {}
+        self.db_time = {}
+        self.db_queries = {}
+        self.template_time = {}
+        self.pool_wait = {}
+        self.pool_timeouts = {}
+        self.request_response = {}
+        self.status_counts = {}
+        self.in_flight = 0
+        self._collectors = []
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+        app.extensions['metrics'] = self
+
+    def register_collector(self, collector):
+        """Add a callable returning ``[(name, help, type, value), ...]``"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def observe(self, store, key, value, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            histogram = store.get(key)
+            if histogram is None:
+                histogram = store[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, store, key, amount=1):
+        with self._lock:
+            store[key] = store.get(key, 0) + amount
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_db_time = 0.0
+        g._metrics_db_queries = 0
+        with self._lock:
+            self.in_flight += 1
+
+    def _after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        status = g.pop('_metrics_status', 500 if exc is not None else 200)
+        db_time = g.pop('_metrics_db_time', 0.0)
+        queries = g.pop('_metrics_db_queries', 0)
+
+        with self._lock:
+            self.in_flight -= 1
+            for store, value in ((self.request_latency, elapsed), (self.db_time, db_time)):
+                histogram = store.get(endpoint)
+                if histogram is None:
+                    histogram = store[endpoint] = Histogram()
+                histogram.observe(value)
+            self.db_queries[endpoint] = self.db_queries.get(endpoint, 0) + queries
+            key = (endpoint, status)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def _before_render(self, sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('_metrics_render_starts', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        starts = g.get('_metrics_render_starts') if has_request_context() else None
+        if starts:
+            self.observe(self.template_time, template.name or 'string', time.perf_counter() - starts.pop())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_metrics_query_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if has_request_context() and '_metrics_db_time' in g:
+            g._metrics_db_time += elapsed
+            g._metrics_db_queries += 1
+
+    def render(self):
+        """Current metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            _render_histograms(lines, 'bbms_http_request_duration_seconds',
+                               'Request latency by endpoint.', 'endpoint', self.request_latency)
+            lines.append('# HELP bbms_http_requests_total Responses by endpoint and status.')
+            lines.append('# TYPE bbms_http_requests_total counter')
+            for (endpoint, status), count in sorted(self.status_counts.items()):
+                lines.append(f'bbms_http_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+            lines.append('# HELP bbms_http_requests_in_flight Requests currently being served.')
+            lines.append('# TYPE bbms_http_requests_in_flight gauge')
+            lines.append(f'bbms_http_requests_in_flight {self.in_flight}')
+            _render_histograms(lines, 'bbms_db_time_seconds',
+                               'Total database time per request by endpoint.', 'endpoint', self.db_time)
+            lines.append('# HELP bbms_db_queries_total Database statements executed by endpoint.')
+            lines.append('# TYPE bbms_db_queries_total counter')
+            for endpoint, count in sorted(self.db_queries.items()):
+                lines.append(f'bbms_db_queries_total{{endpoint="{_escape(endpoint)}"}} {count}')
+            _render_histograms(lines, 'bbms_template_render_seconds',
+                               'Template render time by template.', 'template', self.template_time)
+            _render_histograms(lines, 'bbms_db_pool_checkout_wait_seconds',
+                               'Time spent waiting for a pooled connection.', 'pool', self.pool_wait)
+            lines.append('# HELP bbms_db_pool_timeouts_total Checkouts that gave up waiting for a connection.')
+            lines.append('# TYPE bbms_db_pool_timeouts_total counter')
+            for pool, count in sorted(self.pool_timeouts.items()):
+                lines.append(f'bbms_db_pool_timeouts_total{{pool="{_escape(pool)}"}} {count}')
+            _render_histograms(lines, 'bbms_blood_request_response_seconds',
+                               'Time from blood request to approval or rejection.', 'type',
+                               self.request_response)
+
+        for collector in self._collectors:
+            for name, help_text, metric_type, value in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context rather than the connection,
+    # so a statement that raises leaves nothing behind for the next one
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histograms(lines, name, help_text, label, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for key, histogram in sorted(histograms.items()):
+        label_value = _escape(key)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{label_value}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label}="{label_value}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{label}="{label_value}"}} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{{{label}="{label_value}"}} {histogram.count}')
+
+
+metrics = Metrics()
+
+
+def collect_component_stats():
+    """Gauges for the in-process caches, coalescer, activity buffer and streams"""
+    from app.utils.activity_logger import activity_logger
+    from app.utils.change_feed import change_feed
+    from app.utils.response_cache import response_cache
+    from app.utils.single_flight import single_flight
+    from app.utils.storage import generated_storage
+    from app.utils.mailer import outbox_sender
+
+    cache = response_cache.stats()
+    flights = single_flight.stats()
+    storage = generated_storage.stats()
+    mail = outbox_sender.stats()
+    return [
+        ('bbms_response_cache_hits_total', 'Public page cache hits.', 'counter', cache['hits']),
+        ('bbms_response_cache_misses_total', 'Public page cache misses.', 'counter', cache['misses']),
+        ('bbms_response_cache_entries', 'Cached public pages.', 'gauge', cache['entries']),
+        ('bbms_response_cache_bytes', 'Bytes held by the public page cache.', 'gauge', cache['bytes']),
+        ('bbms_single_flight_calls_total', 'Coalescable search calls.', 'counter', flights['calls']),
+        ('bbms_single_flight_coalesced_total', 'Calls served by another in-flight call.', 'counter',
+         flights['coalesced'] + flights['shared_across_processes']),
+        ('bbms_single_flight_coalescing_ratio', 'Share of calls that were coalesced.', 'gauge',
+         flights['coalescing_ratio']),
+        ('bbms_activity_log_pending', 'Activities buffered but not yet written.', 'gauge', activity_logger.pending),
+        ('bbms_activity_log_written_total', 'Buffered activities written.', 'counter', activity_logger.written),
+        ('bbms_sse_subscribers', 'Connected dashboard event streams.', 'gauge', change_feed.subscriber_count()),
+        ('bbms_generated_files_deleted_total', 'Generated files removed by retention.', 'counter',
+         storage['files_deleted']),
+        ('bbms_generated_files_reclaimed_bytes_total', 'Bytes freed by generated file retention.', 'counter',
+         storage['bytes_reclaimed']),
+        ('bbms_email_sent_total', 'Outbox emails delivered.', 'counter', mail['sent']),
+        ('bbms_email_retried_total', 'Outbox emails deferred for a retry.', 'counter', mail['retried']),
+        ('bbms_email_failed_total', 'Outbox emails given up on.', 'counter', mail['failed']),
+    ]
@@ -0,0 +1,158 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_ARG = '_profile'
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class RequestProfiler:
+    """Run individual requests under cProfile when they carry a signed token.
+
+    Admins issue short-lived tokens; a request presenting one in the
+    ``X-Profile-Token`` header or the ``_profile`` query argument is
+    profiled from its first ``before_request`` hook to teardown. Profiles
+    and their metadata are kept in a directory capped at ``max_files``.
+    """
+
+    def __init__(self, app=None):
+        self.max_files = 50
+        self.max_age = 900
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_files = app.config.get('PROFILE_MAX_FILES', 50)
+        self.max_age = app.config.get('PROFILE_TOKEN_MAX_AGE', 900)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['request_profiler'] = self
+
+    def get_profile_dir(self):
+        return current_app.config.get('PROFILE_DIR') or \
+            os.path.join(current_app.instance_path, 'profiles')
+
+    def issue_token(self, admin_id, minutes):
+        """Sign a token that enables profiling for ``minutes`` (capped by config)"""
+        seconds = min(int(minutes * 60), self.max_age)
+        expires_at = int(time.time()) + seconds
+        token = self._serializer().dumps({'by': admin_id, 'exp': expires_at})
+        return token, datetime.utcfromtimestamp(expires_at)
+
+    def verify_token(self, token):
+        """Return the token payload, or None if it is forged or expired"""
+        try:
+            payload = self._serializer().loads(token, max_age=self.max_age)
+        except BadSignature:
+            return None
+        if not isinstance(payload, dict) or payload.get('exp', 0) < time.time():
+            return None
+        return payload
+
+    def list_profiles(self):
+        """Stored profiles, newest first"""
+        profile_dir = self.get_profile_dir()
+        if not os.path.isdir(profile_dir):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(profile_dir), reverse=True):
+            if name.endswith('.json'):
+                with open(os.path.join(profile_dir, name)) as fh:
+                    profiles.append(json.load(fh))
+        return profiles
+
+    def load_profile(self, profile_id, limit=40, sort='cumulative'):
+        """Metadata and the top functions of one stored profile"""
+        profile_id = _SAFE_NAME.sub('', profile_id)
+        base = os.path.join(self.get_profile_dir(), profile_id)
+        if not os.path.exists(base + '.prof'):
+            return None, []
+        with open(base + '.json') as fh:
+            meta = json.load(fh)
+
+        stats = pstats.Stats(base + '.prof')
+        stats.sort_stats(sort)
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            primitive_calls, total_calls, total_time, cumulative_time, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append({
+                'function': name,
+                'location': f'{filename}:{line}' if line else filename,
+                'calls': total_calls if total_calls == primitive_calls else f'{total_calls}/{primitive_calls}',
+                'total_ms': total_time * 1000.0,
+                'cumulative_ms': cumulative_time * 1000.0
+            })
+        return meta, rows
+
+    def _serializer(self):
+        return URLSafeTimedSerializer(current_app.secret_key, salt='request-profile')
+
+    def _before_request(self):
+        token = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG)
+        if not token:
+            return
+        payload = self.verify_token(token)
+        if payload is None:
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another request on this interpreter is already being profiled
+            return
+        g._profile = profile
+        g._profile_started = time.perf_counter()
+        g._profile_issued_by = payload.get('by')
+
+    def _teardown_request(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        elapsed_ms = (time.perf_counter() - g.pop('_profile_started')) * 1000.0
+
+        started_at = datetime.utcnow()
+        endpoint = request.endpoint or 'unmatched'
+        user_id = current_user.get_id() if current_user else None
+        profile_id = _SAFE_NAME.sub('_', f'{started_at:%Y%m%d%H%M%S%f}-{endpoint}-{user_id or "anon"}')
+
+        profile_dir = self.get_profile_dir()
+        os.makedirs(profile_dir, exist_ok=True)
+        base = os.path.join(profile_dir, profile_id)
+        profile.dump_stats(base + '.prof')
+        with open(base + '.json', 'w') as fh:
+            json.dump({
+                'id': profile_id,
+                'created_at': started_at.isoformat() + 'Z',
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'user_id': user_id,
+                'issued_by': g.pop('_profile_issued_by', None),
+                'duration_ms': round(elapsed_ms, 3),
+                'error': repr(exc) if exc is not None else None
+            }, fh)
+        self._prune(profile_dir)
+
+    def _prune(self, profile_dir):
+        names = sorted(name[:-5] for name in os.listdir(profile_dir) if name.endswith('.json'))
+        for stale in names[:max(0, len(names) - self.max_files)]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(profile_dir, stale + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+request_profiler = RequestProfiler()
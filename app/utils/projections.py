@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from app.models import db, User, City, State, BloodInventory, BloodDonation, BloodRequest
+
+# Plain tuples with named fields: no identity map, no change tracking and
+# no lazy loaders, only the columns a list page or export actually prints.
+UserListRow = namedtuple('UserListRow', [
+    'id', 'name', 'email', 'age', 'blood_group', 'role', 'is_approved', 'created_at',
+    'hospital_name', 'license_number', 'hospital_contact', 'camp_name', 'camp_contact',
+    'updated_at', 'city_name', 'state_name'
+])
+HospitalRow = namedtuple('HospitalRow', ['id', 'hospital_name', 'hospital_address', 'hospital_contact'])
+StockRow = namedtuple('StockRow', ['blood_group', 'units_available'])
+DonationExportRow = namedtuple('DonationExportRow', [
+    'id', 'donor_name', 'donor_email', 'blood_group', 'units_donated', 'donation_date',
+    'status', 'certificate_generated'
+])
+RequestExportRow = namedtuple('RequestExportRow', [
+    'id', 'patient_name', 'patient_email', 'blood_group', 'units_requested', 'request_type',
+    'request_date', 'status', 'response_date', 'notes'
+])
+
+# Rows fetched per round trip while streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+
+def fetch_rows(row_type, statement):
+    """Run a column select and wrap every row in ``row_type``"""
+    return [row_type._make(row) for row in db.session.execute(statement)]
+
+
+def stream_rows(row_type, statement, batch_size=EXPORT_BATCH_SIZE):
+    """Like ``fetch_rows`` but yields batch by batch, for exports of any size"""
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield row_type._make(row)
+    finally:
+        result.close()
+
+
+def user_list_rows():
+    """Every user, newest first, with city and state names joined in"""
+    statement = select(
+        User.id, User.name, User.email, User.age, User.blood_group, User.role, User.is_approved,
+        User.created_at, User.hospital_name, User.license_number, User.hospital_contact,
+        User.camp_name, User.camp_contact, User.updated_at, City.name, State.name
+    ).outerjoin(City, User.city_id == City.id)\
+     .outerjoin(State, User.state_id == State.id)\
+     .order_by(User.created_at.desc())
+    return fetch_rows(UserListRow, statement)
+
+
+def hospitals_with_stock(city_id):
+    """Hospitals in a city with their inventory, in two queries"""
+    hospitals = fetch_rows(HospitalRow, select(
+        User.id, User.hospital_name, User.hospital_address, User.hospital_contact
+    ).where(User.role == 'hospital', User.city_id == city_id))
+
+    stock = {hospital.id: [] for hospital in hospitals}
+    if stock:
+        rows = db.session.execute(
+            select(BloodInventory.hospital_id, BloodInventory.blood_group, BloodInventory.units_available)
+            .where(BloodInventory.hospital_id.in_(stock))
+            .order_by(BloodInventory.id)
+        )
+        for hospital_id, blood_group, units_available in rows:
+            stock[hospital_id].append(StockRow(blood_group, units_available))
+    return [{'hospital': hospital, 'inventory': stock[hospital.id]} for hospital in hospitals]
+
+
+def donation_export_rows(*criteria):
+    """Donations matching ``criteria`` with donor name and email, streamed"""
+    statement = select(
+        BloodDonation.id, User.name, User.email, BloodDonation.blood_group, BloodDonation.units_donated,
+        BloodDonation.donation_date, BloodDonation.status, BloodDonation.certificate_generated
+    ).join(User, BloodDonation.donor_id == User.id).where(*criteria).order_by(BloodDonation.id)
+    return stream_rows(DonationExportRow, statement)
+
+
+def request_export_rows(*criteria):
+    """Blood requests matching ``criteria`` with patient name and email, streamed"""
+    statement = select(
+        BloodRequest.id, User.name, User.email, BloodRequest.blood_group, BloodRequest.units_requested,
+        BloodRequest.request_type, BloodRequest.request_date, BloodRequest.status,
+        BloodRequest.response_date, BloodRequest.notes
+    ).join(User, BloodRequest.patient_id == User.id).where(*criteria).order_by(BloodRequest.id)
+    return stream_rows(RequestExportRow, statement)
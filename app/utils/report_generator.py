@@ -1,28 +1,22 @@
 import csv
-import os
-from datetime import datetime
-from flask import current_app
-from app.models import BloodDonation, BloodRequest, User
+from app.models import BloodDonation, BloodRequest
+from app.utils.projections import donation_export_rows, request_export_rows
+from app.utils.storage import generated_storage
 
 def generate_donation_report(hospital_id, start_date=None, end_date=None, report_type='monthly'):
     """Generate CSV report for donations"""
     
-    # Create reports directory if it doesn't exist
-    reports_dir = os.path.join(current_app.root_path, 'static', 'reports')
-    os.makedirs(reports_dir, exist_ok=True)
-    
-    # Build query
-    query = BloodDonation.query.filter_by(hospital_id=hospital_id, status='approved')
+    # Build filters; rows are streamed straight into the CSV
+    criteria = [BloodDonation.hospital_id == hospital_id, BloodDonation.status == 'approved']
     
     if start_date and end_date:
-        query = query.filter(BloodDonation.donation_date.between(start_date, end_date))
+        criteria.append(BloodDonation.donation_date.between(start_date, end_date))
     
-    donations = query.join(User, BloodDonation.donor_id == User.id).all()
+    donations = donation_export_rows(*criteria)
     
     # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"donations_report_{report_type}_{timestamp}.csv"
-    filepath = os.path.join(reports_dir, filename)
+    filename = generated_storage.new_filename(f'donations_report_{report_type}', 'csv')
+    filepath = generated_storage.path('reports', filename)
     
     # Write CSV
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
@@ -36,8 +30,8 @@ def generate_donation_report(hospital_id, start_date=None, end_date=None, report
         for donation in donations:
             writer.writerow({
                 'Donation ID': donation.id,
-                'Donor Name': donation.donor.name,
-                'Donor Email': donation.donor.email,
+                'Donor Name': donation.donor_name,
+                'Donor Email': donation.donor_email,
                 'Blood Group': donation.blood_group,
                 'Units Donated': donation.units_donated,
                 'Donation Date': donation.donation_date.strftime('%Y-%m-%d'),
@@ -50,22 +44,17 @@ def generate_donation_report(hospital_id, start_date=None, end_date=None, report
 def generate_request_report(hospital_id, start_date=None, end_date=None, report_type='monthly'):
     """Generate CSV report for blood requests"""
     
-    # Create reports directory if it doesn't exist
-    reports_dir = os.path.join(current_app.root_path, 'static', 'reports')
-    os.makedirs(reports_dir, exist_ok=True)
-    
-    # Build query
-    query = BloodRequest.query.filter_by(hospital_id=hospital_id)
+    # Build filters; rows are streamed straight into the CSV
+    criteria = [BloodRequest.hospital_id == hospital_id]
     
     if start_date and end_date:
-        query = query.filter(BloodRequest.request_date.between(start_date, end_date))
+        criteria.append(BloodRequest.request_date.between(start_date, end_date))
     
-    requests = query.join(User, BloodRequest.patient_id == User.id).all()
+    requests = request_export_rows(*criteria)
     
     # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"requests_report_{report_type}_{timestamp}.csv"
-    filepath = os.path.join(reports_dir, filename)
+    filename = generated_storage.new_filename(f'requests_report_{report_type}', 'csv')
+    filepath = generated_storage.path('reports', filename)
     
     # Write CSV
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
@@ -79,8 +68,8 @@ def generate_request_report(hospital_id, start_date=None, end_date=None, report_
         for request in requests:
             writer.writerow({
                 'Request ID': request.id,
-                'Patient Name': request.patient.name,
-                'Patient Email': request.patient.email,
+                'Patient Name': request.patient_name,
+                'Patient Email': request.patient_email,
                 'Blood Group': request.blood_group,
                 'Units Requested': request.units_requested,
                 'Request Type': request.request_type.title(),
@@ -95,22 +84,17 @@ def generate_request_report(hospital_id, start_date=None, end_date=None, report_
 def generate_camp_donor_report(camp_id, start_date=None, end_date=None):
     """Generate CSV report for camp donors"""
     
-    # Create reports directory if it doesn't exist
-    reports_dir = os.path.join(current_app.root_path, 'static', 'reports')
-    os.makedirs(reports_dir, exist_ok=True)
-    
-    # Build query
-    query = BloodDonation.query.filter_by(camp_id=camp_id, status='approved')
+    # Build filters; rows are streamed straight into the CSV
+    criteria = [BloodDonation.camp_id == camp_id, BloodDonation.status == 'approved']
     
     if start_date and end_date:
-        query = query.filter(BloodDonation.donation_date.between(start_date, end_date))
+        criteria.append(BloodDonation.donation_date.between(start_date, end_date))
     
-    donations = query.join(User, BloodDonation.donor_id == User.id).all()
+    donations = donation_export_rows(*criteria)
     
     # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"camp_donors_report_{timestamp}.csv"
-    filepath = os.path.join(reports_dir, filename)
+    filename = generated_storage.new_filename('camp_donors_report', 'csv')
+    filepath = generated_storage.path('reports', filename)
     
     # Write CSV
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
@@ -124,8 +108,8 @@ def generate_camp_donor_report(camp_id, start_date=None, end_date=None):
         for donation in donations:
             writer.writerow({
                 'Donation ID': donation.id,
-                'Donor Name': donation.donor.name,
-                'Donor Email': donation.donor.email,
+                'Donor Name': donation.donor_name,
+                'Donor Email': donation.donor_email,
                 'Blood Group': donation.blood_group,
                 'Units Donated': donation.units_donated,
                 'Donation Date': donation.donation_date.strftime('%Y-%m-%d'),
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+
+from app.models import BloodRequest, REQUEST_PRIORITY, db
+
+SLA_PERCENTILES = (50, 90, 99)
+
+
+def top_critical(hospital_id, limit=None):
+    """Head of the critical queue in one query on ``ix_blood_request_queue``.
+
+    Aging never lifts a normal request to the critical base priority, so
+    the priority bound keeps the scan inside the critical part of the index.
+    """
+    limit = limit or current_app.config.get('DASHBOARD_CRITICAL_LIMIT', 5)
+    return BloodRequest.query.options(joinedload(BloodRequest.patient))\
+                             .filter(BloodRequest.hospital_id == hospital_id,
+                                     BloodRequest.status == 'pending',
+                                     BloodRequest.priority >= REQUEST_PRIORITY['critical'],
+                                     BloodRequest.request_type == 'critical')\
+                             .order_by(BloodRequest.priority.desc(), BloodRequest.request_date)\
+                             .limit(limit).all()
+
+
+def age_pending_requests(now=None):
+    """Raise the priority of pending requests by how long they have waited.
+
+    Each ``REQUEST_AGING_MINUTES`` of waiting adds ``REQUEST_AGING_POINTS``
+    up to ``REQUEST_AGING_MAX``. One indexed UPDATE per level and type
+    only touches rows that have crossed a new level, so the job stays cheap
+    however long the queue is. Levels are applied highest first, so a row
+    that crossed several levels since the last run is written once, at
+    its highest. Returns the number of rows changed.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    step = timedelta(minutes=config.get('REQUEST_AGING_MINUTES', 30))
+    points = config.get('REQUEST_AGING_POINTS', 5)
+    ceiling = config.get('REQUEST_AGING_MAX', 90)
+
+    changed = 0
+    for request_type, base in REQUEST_PRIORITY.items():
+        for level in range(ceiling // points, 0, -1):
+            priority = base + level * points
+            changed += db.session.execute(
+                update(BloodRequest)
+                .where(BloodRequest.status == 'pending',
+                       BloodRequest.request_type == request_type,
+                       BloodRequest.request_date <= now - level * step,
+                       BloodRequest.priority < priority)
+                .values(priority=priority)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+    db.session.commit()
+    return changed
+
+
+def record_response(blood_request):
+    """Feed an approval or rejection into the response time histogram"""
+    from app.utils.metrics import metrics, RESPONSE_BUCKETS
+
+    if blood_request.response_date and blood_request.request_date:
+        waited = (blood_request.response_date - blood_request.request_date).total_seconds()
+        metrics.observe(metrics.request_response, blood_request.request_type, waited, RESPONSE_BUCKETS)
+
+
+def response_sla(hospital_id, days=None, now=None):
+    """Time-to-response percentiles per request type over the recent window"""
+    days = days or current_app.config.get('REQUEST_SLA_WINDOW_DAYS', 30)
+    since = (now or datetime.utcnow()) - timedelta(days=days)
+    rows = db.session.execute(
+        select(BloodRequest.request_type, BloodRequest.request_date, BloodRequest.response_date)
+        .where(BloodRequest.hospital_id == hospital_id,
+               BloodRequest.status.in_(['approved', 'rejected']),
+               BloodRequest.response_date >= since)
+    ).all()
+
+    waits = {}
+    for request_type, requested, responded in rows:
+        waits.setdefault(request_type, []).append((responded - requested).total_seconds())
+
+    sla = []
+    for request_type in sorted(waits, key=lambda name: -REQUEST_PRIORITY.get(name, 0)):
+        values = sorted(waits[request_type])
+        sla.append({
+            'request_type': request_type,
+            'count': len(values),
+            'percentiles': {p: format_duration(_percentile(values, p)) for p in SLA_PERCENTILES}
+        })
+    return sla
+
+
+def _percentile(values, percentile):
+    """Nearest-rank percentile of a sorted list"""
+    rank = max(1, -(-percentile * len(values) // 100))
+    return values[rank - 1]
+
+
+def format_duration(seconds):
+    """Compact wait time such as 45s, 12m, 3.5h or 2.0d"""
+    if seconds < 60:
+        return f'{max(seconds, 0):.0f}s'
+    if seconds < 3600:
+        return f'{seconds / 60:.0f}m'
+    if seconds < 86400:
+        return f'{seconds / 3600:.1f}h'
+    return f'{seconds / 86400:.1f}d'
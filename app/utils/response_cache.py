@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, make_response, current_app
+from flask_login import current_user
+
+
+class ResponseCache:
+    """Bounded in-memory cache for public page responses.
+
+    Entries expire after their TTL and the least recently used ones are
+    evicted once either the entry count or the total body size goes over
+    its limit. Entries can carry tags such as ``('city', state_id, city_id)``
+    so that writes invalidate exactly the pages they affect. The cache is
+    per process; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_entries = 512
+        self.max_bytes = 32 * 1024 * 1024
+        self.default_ttl = 60
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 512)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        self.default_ttl = app.config.get('RESPONSE_CACHE_DEFAULT_TTL', 60)
+        app.extensions['response_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, status, content_type, body, ttl=None, tags=()):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                'expires_at': time.monotonic() + (ttl or self.default_ttl),
+                'status': status,
+                'content_type': content_type,
+                'body': body,
+                'tags': tuple(tags)
+            }
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry['body'])
+        for tag in entry['tags']:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+response_cache = ResponseCache()
+
+
+def city_tag(state_id, city_id):
+    return ('city', state_id, city_id)
+
+
+def invalidate_city(state_id, city_id):
+    """Invalidate cached public pages for a (state, city)"""
+    response_cache.invalidate(city_tag(state_id, city_id))
+
+
+def cached_response(ttl=None, tags=None):
+    """Cache a public GET view for anonymous visitors.
+
+    ``tags`` is an optional callable returning the invalidation tags for the
+    current request. Logged-in users and requests with pending flash
+    messages always get a freshly rendered page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (not response_cache.enabled or request.method != 'GET' or
+                    current_user.is_authenticated or session.get('_flashes')):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+            entry = response_cache.get(key)
+            if entry is not None:
+                response = current_app.response_class(entry['body'], status=entry['status'],
+                                                      content_type=entry['content_type'])
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                response_cache.set(key, response.status_code, response.content_type,
+                                   response.get_data(), ttl=ttl,
+                                   tags=tags() if tags else ())
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
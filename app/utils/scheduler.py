@@ -0,0 +1,363 @@
+import atexit
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+# Cron field bounds: minute, hour, day of month, month, day of week (0 = Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f'Cron field "{field}" is out of range {low}-{high}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Standard five-field cron expression evaluated in server local time"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        fields = CRON_ALIASES.get(spec, spec).split()
+        if len(fields) != 5:
+            raise ValueError(f'Cron expression "{spec}" needs five fields')
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS))
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return in_week
+        if self.any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def next_after(self, moment):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                candidate = datetime(year, candidate.month % 12 + 1, 1)
+            elif not self._day_matches(candidate):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time())
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f'Cron expression "{self.spec}" never matches')
+
+
+class IntervalSchedule:
+    """Run every ``seconds`` seconds"""
+
+    def __init__(self, seconds):
+        self.spec = str(seconds)
+        self.seconds = int(seconds)
+        if self.seconds <= 0:
+            raise ValueError('Interval must be positive')
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+
+def parse_schedule(spec):
+    """A cron expression or a number of seconds"""
+    spec = str(spec).strip()
+    if spec.isdigit():
+        return IntervalSchedule(spec)
+    return CronSchedule(spec)
+
+
+class _Job:
+    __slots__ = ('name', 'func', 'schedule', 'run_at_start', 'next_run', 'registered')
+
+    def __init__(self, name, func, schedule, run_at_start):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.run_at_start = run_at_start
+        self.next_run = None
+        self.registered = False
+
+
+class Scheduler:
+    """In-process periodic job runner with a database leader lock.
+
+    Every worker process runs the scheduler thread, but a job only runs
+    where an atomic UPDATE on its ``scheduled_job`` row claims it, so each
+    slot runs once across the deployment. The same row records timing and
+    failure statistics, and its ``next_run_at`` lets a job that was missed
+    while the app was down catch up on start. Schedules come from
+    ``SCHEDULER_JOBS`` as cron expressions or intervals in seconds.
+
+    The claim is a short lease (``SCHEDULER_LOCK_TIMEOUT``) renewed while
+    the job runs, and a process releases its leases on exit, so a worker
+    that dies mid-run only blocks the job briefly. Nothing starts under
+    the ``flask`` CLI or with ``TESTING`` set.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = True
+        self.lock_timeout = 120
+        self.worker_id = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._running = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('SCHEDULER_ENABLED', True) and not app.testing
+        self.lock_timeout = app.config.get('SCHEDULER_LOCK_TIMEOUT', 120)
+        if self.enabled:
+            # Restarts the thread in workers forked after create_app
+            app.before_request(self._ensure_started)
+            atexit.register(self.shutdown)
+        app.extensions['scheduler'] = self
+
+    def add_job(self, name, func, schedule=None, run_at_start=False):
+        """Register ``func`` under ``name``; the schedule defaults to SCHEDULER_JOBS[name].
+
+        Jobs without a schedule are disabled. ``run_at_start`` only
+        applies the first time a job is seen by the database.
+        """
+        spec = schedule or self.app.config.get('SCHEDULER_JOBS', {}).get(name)
+        with self._lock:
+            if not spec:
+                self._jobs.pop(name, None)
+                return
+            self._jobs[name] = _Job(name, func, parse_schedule(spec), run_at_start)
+        self._wake.set()
+
+    def start(self):
+        """Start the scheduler thread for this process.
+
+        Skipped inside a ``flask`` command, where the process is usually
+        short-lived; ``flask run`` still starts it on the first request.
+        """
+        if self.enabled and click.get_current_context(silent=True) is None:
+            self._ensure_started()
+
+    def shutdown(self, timeout=10):
+        """Stop the thread, wait briefly for a running job and release our leases"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        # A job still running after the timeout dies with the process
+        if self._running.acquire(timeout=timeout):
+            self._running.release()
+        self._release_leases()
+
+    def run_job(self, name):
+        """Run a registered job immediately in the current app context"""
+        return self._jobs[name].func()
+
+    def job_stats(self):
+        from app.models import ScheduledJob
+
+        return ScheduledJob.query.order_by(ScheduledJob.name).all()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self.worker_id = f'{socket.gethostname()}:{self._pid}'
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = datetime.now()
+            with self._lock:
+                jobs = list(self._jobs.values())
+
+            for job in jobs:
+                if self._stop.is_set():
+                    return
+                if not job.registered:
+                    self._register(job)
+                if job.registered and job.next_run <= now:
+                    with self._running:
+                        self._claim_and_run(job)
+
+            upcoming = min((job.next_run for job in jobs if job.registered), default=None)
+            timeout = 60.0 if upcoming is None else \
+                min(60.0, max(0.5, (upcoming - datetime.now()).total_seconds()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _register(self, job):
+        """Create or refresh the job's row and adopt its next run time"""
+        from app.models import ScheduledJob, db
+
+        with self.app.app_context():
+            try:
+                row = db.session.get(ScheduledJob, job.name)
+                now = datetime.now()
+                if row is None:
+                    row = ScheduledJob(name=job.name, schedule=job.schedule.spec,
+                                       next_run_at=now if job.run_at_start else job.schedule.next_after(now))
+                    db.session.add(row)
+                elif row.schedule != job.schedule.spec or row.next_run_at is None:
+                    row.schedule = job.schedule.spec
+                    row.next_run_at = job.schedule.next_after(now)
+                job.next_run = row.next_run_at
+                db.session.commit()
+                job.registered = True
+            except IntegrityError:
+                # Another worker created the row first
+                db.session.rollback()
+            except SQLAlchemyError:
+                db.session.rollback()
+                self.app.logger.exception('Could not register scheduled job %s', job.name)
+            finally:
+                db.session.remove()
+
+    def _claim_and_run(self, job):
+        from app.models import ScheduledJob, db
+
+        with self.app.app_context():
+            try:
+                now = datetime.now()
+                claimed = db.session.execute(
+                    update(ScheduledJob)
+                    .where(ScheduledJob.name == job.name,
+                           or_(ScheduledJob.locked_until == None, ScheduledJob.locked_until < now),
+                           ScheduledJob.next_run_at <= now)
+                    .values(locked_by=self.worker_id,
+                            locked_until=now + timedelta(seconds=self.lock_timeout),
+                            last_started_at=now)
+                ).rowcount == 1
+                db.session.commit()
+
+                if not claimed:
+                    # Someone else ran it or is running it; follow their schedule
+                    next_run_at = db.session.get(ScheduledJob, job.name).next_run_at
+                    job.next_run = next_run_at if next_run_at and next_run_at > now \
+                        else now + timedelta(seconds=60)
+                    return
+
+                started = time.perf_counter()
+                error = None
+                finished_event = threading.Event()
+                renewer = threading.Thread(target=self._renew_lease, args=(job.name, finished_event),
+                                           name=f'scheduler-lease-{job.name}', daemon=True)
+                renewer.start()
+                try:
+                    job.func()
+                except Exception as exc:
+                    db.session.rollback()
+                    error = exc
+                    self.app.logger.exception('Scheduled job %s failed', job.name)
+                finally:
+                    finished_event.set()
+                    renewer.join()
+                duration = time.perf_counter() - started
+
+                finished = datetime.now()
+                job.next_run = job.schedule.next_after(finished)
+                values = dict(next_run_at=job.next_run, locked_by=None, locked_until=None,
+                              last_finished_at=finished, last_duration=duration,
+                              run_count=ScheduledJob.run_count + 1)
+                if error is None:
+                    values.update(last_success_at=finished, consecutive_failures=0)
+                else:
+                    values.update(failure_count=ScheduledJob.failure_count + 1,
+                                  consecutive_failures=ScheduledJob.consecutive_failures + 1,
+                                  last_error=repr(error)[:1000])
+                db.session.execute(update(ScheduledJob).where(ScheduledJob.name == job.name).values(**values))
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                job.next_run = datetime.now() + timedelta(seconds=60)
+                self.app.logger.exception('Scheduler bookkeeping for %s failed', job.name)
+            finally:
+                db.session.remove()
+
+    def _renew_lease(self, name, finished):
+        """Extend our lease on ``name`` every third of the timeout until ``finished``"""
+        from app.models import ScheduledJob, db
+
+        while not finished.wait(self.lock_timeout / 3):
+            with self.app.app_context():
+                try:
+                    db.session.execute(
+                        update(ScheduledJob)
+                        .where(ScheduledJob.name == name, ScheduledJob.locked_by == self.worker_id)
+                        .values(locked_until=datetime.now() + timedelta(seconds=self.lock_timeout))
+                    )
+                    db.session.commit()
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    self.app.logger.exception('Could not renew the lease on scheduled job %s', name)
+                finally:
+                    db.session.remove()
+
+    def _release_leases(self):
+        """Free every job this process still holds so another worker can run it"""
+        from app.models import ScheduledJob, db
+
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(ScheduledJob)
+                    .where(ScheduledJob.locked_by == self.worker_id)
+                    .values(locked_by=None, locked_until=None)
+                )
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce identical concurrent computations.
+
+    Threads asking for a key that is already being computed wait for the
+    in-flight call and share its result. When a lock directory is
+    configured, worker processes also serialise on a per-key lock file and
+    reuse a result another process wrote within ``share_window`` seconds,
+    so results must be picklable.
+    """
+
+    def __init__(self, app=None):
+        self.lock_dir = None
+        self.share_window = 1.0
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.shared = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.lock_dir = app.config.get('SINGLE_FLIGHT_LOCK_DIR') if fcntl else None
+        self.share_window = app.config.get('SINGLE_FLIGHT_SHARE_WINDOW', 1.0)
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        app.extensions['single_flight'] = self
+
+    def do(self, key, fn):
+        """Return ``fn()``, sharing one execution among concurrent callers of ``key``"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(key, fn)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            calls = self.calls
+            return {
+                'calls': calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'shared_across_processes': self.shared,
+                'in_flight': len(self._calls),
+                'coalescing_ratio': round((self.coalesced + self.shared) / calls, 4) if calls else 0.0
+            }
+
+    def _execute(self, key, fn):
+        if not self.lock_dir:
+            with self._lock:
+                self.executions += 1
+            return fn()
+
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.lock_dir, f'{digest}.lock')
+        result_path = os.path.join(self.lock_dir, f'{digest}.result')
+
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have just finished the same computation
+                try:
+                    if time.time() - os.path.getmtime(result_path) <= self.share_window:
+                        with open(result_path, 'rb') as fh:
+                            result = pickle.load(fh)
+                        with self._lock:
+                            self.shared += 1
+                        return result
+                except (OSError, EOFError, pickle.UnpicklingError):
+                    pass
+
+                with self._lock:
+                    self.executions += 1
+                result = fn()
+
+                tmp_path = f'{result_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as fh:
+                    pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, result_path)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+_PLACEHOLDER = re.compile(r'\?|%s|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """Collapse literals, placeholders and IN lists so equivalent statements match"""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describe bound parameters by type only, never by value"""
+    if executemany and parameters:
+        return f'{len(parameters)} x {parameter_shape(parameters[0])}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}'
+                               for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+
+class SlowQueryLog:
+    """Record statements slower than a threshold, with one EXPLAIN per statement.
+
+    Each slow execution is written as a JSON line to a rotating log file
+    and aggregated in memory by normalized SQL for the admin page. The
+    plan is captured on a raw DBAPI cursor, so it neither fires the
+    cursor events again nor shows up in the request's query counts.
+    """
+
+    def __init__(self, app=None, max_statements=500):
+        self.threshold = 0.2
+        self.explain = True
+        self.max_statements = max_statements
+        self.statements = {}
+        self.logger = logging.getLogger('bbms.slow_query')
+        self.logger.propagate = False
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200)
+        if threshold_ms is None or threshold_ms < 0:
+            return
+        self.threshold = threshold_ms / 1000.0
+        self.explain = app.config.get('SLOW_QUERY_EXPLAIN', True)
+
+        log_file = app.config.get('SLOW_QUERY_LOG_FILE') or \
+            os.path.join(app.instance_path, 'slow_queries.log')
+        if not any(getattr(handler, 'baseFilename', None) == os.path.abspath(log_file)
+                   for handler in self.logger.handlers):
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            handler = RotatingFileHandler(log_file,
+                                          maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                                          backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5))
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+        app.extensions['slow_query_log'] = self
+
+    def top(self, limit=25):
+        """Slowest statements by total time spent"""
+        with self._lock:
+            entries = [dict(entry, endpoints=sorted(entry['endpoints'].items(), key=lambda e: -e[1]))
+                       for entry in self.statements.values()]
+        entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_slow_query_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < self.threshold or conn.info.get('_slow_query_explaining'):
+            return
+
+        sql = normalize_sql(statement)
+        fingerprint = hashlib.sha1(sql.encode('utf-8')).hexdigest()[:12]
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        shape = parameter_shape(parameters, executemany)
+        elapsed_ms = elapsed * 1000.0
+
+        with self._lock:
+            entry = self.statements.get(fingerprint)
+            first_seen = entry is None
+            if first_seen:
+                if len(self.statements) >= self.max_statements:
+                    cheapest = min(self.statements, key=lambda key: self.statements[key]['total_ms'])
+                    del self.statements[cheapest]
+                entry = self.statements[fingerprint] = {
+                    'fingerprint': fingerprint, 'sql': sql, 'parameters': shape,
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'endpoints': {}, 'plan': None, 'last_seen': None
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['endpoints'][endpoint] = entry['endpoints'].get(endpoint, 0) + 1
+            entry['last_seen'] = datetime.utcnow()
+
+        plan = None
+        if first_seen and self.explain and not executemany:
+            plan = self._explain(conn, statement, parameters)
+            with self._lock:
+                entry['plan'] = plan
+
+        record = {
+            'time': datetime.utcnow().isoformat() + 'Z',
+            'fingerprint': fingerprint,
+            'duration_ms': round(elapsed_ms, 3),
+            'endpoint': endpoint,
+            'sql': sql,
+            'parameters': shape
+        }
+        if plan is not None:
+            record['plan'] = plan
+        self.logger.info(json.dumps(record))
+
+    def _explain(self, conn, statement, parameters):
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+        conn.info['_slow_query_explaining'] = True
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [' | '.join(str(value) for value in row) for row in cursor.fetchall()]
+        except Exception as error:
+            return [f'EXPLAIN failed: {error}']
+        finally:
+            cursor.close()
+            conn.info['_slow_query_explaining'] = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Per statement, so a failed execution cannot shift later timings
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,140 @@
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+GENERATED_KINDS = ('reports', 'certificates')
+
+
+class GeneratedStorage:
+    """Private storage for generated reports and certificates.
+
+    Files live under ``GENERATED_FILES_DIR`` (the instance folder by
+    default) instead of the public ``static/`` tree, so they can only be
+    fetched through the authorised download routes. ``cleanup`` applies
+    the retention policy: files older than the age limit go first, then
+    the oldest files until the total fits the size cap, deleted in
+    batches so a large backlog never holds the job for long.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self.max_age = 24 * 3600
+        self.max_bytes = 512 * 1024 * 1024
+        self.batch_size = 200
+        self.batch_pause = 0.05
+        self._lock = threading.Lock()
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_cleanup = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config.get('GENERATED_FILES_DIR') or \
+            os.path.join(app.instance_path, 'generated')
+        self.max_age = app.config.get('GENERATED_FILES_MAX_AGE_HOURS', 24) * 3600
+        self.max_bytes = app.config.get('GENERATED_FILES_MAX_BYTES', 512 * 1024 * 1024)
+        self.batch_size = app.config.get('GENERATED_FILES_DELETE_BATCH', 200)
+        app.extensions['generated_storage'] = self
+
+    def directory(self, kind):
+        """Directory for one kind of generated file, created on demand"""
+        if kind not in GENERATED_KINDS:
+            raise ValueError(f'Unknown generated file kind {kind}')
+        path = os.path.join(self.root, kind)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, kind, filename):
+        """Absolute path of a generated file; rejects names that leave the directory"""
+        if os.path.basename(filename) != filename:
+            raise ValueError('Generated file names cannot contain directories')
+        return os.path.join(self.directory(kind), filename)
+
+    def new_filename(self, stem, extension):
+        """Timestamped name with a random suffix so concurrent downloads never collide"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f'{stem}_{timestamp}_{secrets.token_hex(4)}.{extension}'
+
+    def usage(self):
+        """Files and bytes currently held, per kind"""
+        usage = {}
+        for kind in GENERATED_KINDS:
+            entries = self._scan(kind)
+            usage[kind] = {'files': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+        return usage
+
+    def cleanup(self, now=None):
+        """Apply the age and size limits; returns what was removed"""
+        now = now or time.time()
+        entries = [entry for kind in GENERATED_KINDS for entry in self._scan(kind)]
+        entries.sort()
+
+        expired = [entry for entry in entries if now - entry[0] > self.max_age]
+        kept = entries[len(expired):]
+        kept_bytes = sum(size for _, size, _ in kept)
+        over_cap = []
+        for entry in kept:
+            if kept_bytes <= self.max_bytes:
+                break
+            over_cap.append(entry)
+            kept_bytes -= entry[1]
+
+        victims = expired + over_cap
+        deleted = reclaimed = 0
+        for start in range(0, len(victims), self.batch_size):
+            for _, size, path in victims[start:start + self.batch_size]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                deleted += 1
+                reclaimed += size
+            if start + self.batch_size < len(victims):
+                time.sleep(self.batch_pause)
+
+        result = {
+            'files_deleted': deleted,
+            'bytes_reclaimed': reclaimed,
+            'expired': len(expired),
+            'over_size_cap': len(over_cap),
+            'bytes_remaining': kept_bytes
+        }
+        with self._lock:
+            self.files_deleted += deleted
+            self.bytes_reclaimed += reclaimed
+            self.last_cleanup = dict(result, finished_at=datetime.utcnow())
+        current_app.logger.info('Generated file cleanup removed %d files (%d bytes)', deleted, reclaimed)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files_deleted': self.files_deleted,
+                'bytes_reclaimed': self.bytes_reclaimed,
+                'last_cleanup': self.last_cleanup
+            }
+
+    def _scan(self, kind):
+        path = os.path.join(self.root, kind)
+        if not os.path.isdir(path):
+            return []
+        entries = []
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+
+generated_storage = GeneratedStorage()
+
+
+def cleanup_generated_files():
+    """Scheduled job wrapper for the retention policy"""
+    return generated_storage.cleanup()
@@ -0,0 +1,51 @@
+from sqlalchemy.orm import joinedload
+
+from app.models import BloodInventory, BloodRequest
+from app.utils.blood_groups import COMPATIBILITY_DATA
+
+
+class RequestRow:
+    """One blood request with its stock check worked out in advance"""
+    __slots__ = ('request', 'available_units', 'can_fulfil', 'substitutes')
+
+    def __init__(self, blood_request, stock):
+        self.request = blood_request
+        self.available_units = stock.get(blood_request.blood_group)
+        self.can_fulfil = (self.available_units or 0) >= blood_request.units_requested
+        self.substitutes = []
+        if blood_request.status == 'pending' and not self.can_fulfil:
+            # Compatible groups that could cover the whole request instead
+            self.substitutes = [
+                (group, stock[group])
+                for group in COMPATIBILITY_DATA.get(blood_request.blood_group, {}).get('can_receive_from', [])
+                if group != blood_request.blood_group and stock.get(group, 0) >= blood_request.units_requested
+            ]
+
+
+class HospitalRequestsView:
+    """Everything ``hospital/requests.html`` renders, loaded in two queries.
+
+    Requests come with their patients in one joined query and the
+    hospital's inventory is read once into a dict by blood group, so the
+    template does no lazy loading or per-row inventory scans. With the
+    login's user lookup the whole page takes three queries.
+    """
+
+    def __init__(self, hospital_id):
+        requests = BloodRequest.query.options(joinedload(BloodRequest.patient))\
+                                     .filter(BloodRequest.hospital_id == hospital_id).all()
+        self.stock = {
+            inventory.blood_group: inventory.units_available
+            for inventory in BloodInventory.query.filter_by(hospital_id=hospital_id)
+        }
+
+        pending = sorted((r for r in requests if r.status == 'pending'),
+                         key=lambda r: (-r.priority, r.request_date))
+        processed = sorted((r for r in requests if r.status != 'pending'),
+                           key=lambda r: r.request_date, reverse=True)
+        self.pending = [RequestRow(r, self.stock) for r in pending]
+        self.critical = [row for row in self.pending if row.request.request_type == 'critical']
+        self.processed = processed
+
+    def __bool__(self):
+        return bool(self.pending or self.processed)
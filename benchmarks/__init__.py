@@ -0,0 +1,29 @@
+"""Load-test and benchmark tooling.
+
+Seed a database with a reproducible synthetic data set, then drive the
+app concurrently and collect per-endpoint latency figures:
+
+    python -m benchmarks.seed --database-url sqlite:///bench.db --reset --scale 1
+    python -m benchmarks.scenarios --database-url sqlite:///bench.db --concurrency 8 --duration 30 --output run.json
+    python -m benchmarks.compression --database-url sqlite:///bench.db --output compression.json
+    python -m benchmarks.projection --database-url sqlite:///bench.db --users 100000 --output projection.json
+    python -m benchmarks.instrumentation --output instrumentation.json
+
+Run both from the repository root. Seeded accounts all use the password
+``password`` (see ``benchmarks.seed``).
+"""
+from config import Config
+
+
+def create_bench_app(database_url, **overrides):
+    """Create the app bound to a benchmark database"""
+    from app import create_app
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        # Background jobs would compete with (and change data under) timed runs
+        SCHEDULER_ENABLED = False
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+    return create_app(BenchConfig)
@@ -0,0 +1,151 @@
+"""Measure bytes saved and CPU spent by response compression.
+
+Fetches a fixed set of large pages from a seeded database once
+uncompressed, then compresses each body repeatedly with every gzip level
+(and Brotli qualities when the ``brotli`` package is installed) and
+reports the compressed size and thread CPU time per response. A final
+pass requests each page through the app with ``Accept-Encoding`` to show
+the end-to-end cost of the middleware at the configured settings:
+
+    python -m benchmarks.compression --database-url sqlite:///bench.db --output compression.json
+"""
+import argparse
+import json
+import platform
+import time
+import zlib
+from datetime import datetime
+
+from benchmarks import create_bench_app
+from benchmarks.scenarios import Fixtures
+from benchmarks.seed import PASSWORD
+
+# name -> (role, path template)
+PAGES = {
+    'home': ('anonymous', '/'),
+    'search_blood': ('anonymous', '/search/blood?state_id={state_id}&city_id={city_id}&blood_group='),
+    'api_inventory': ('anonymous', '/api/inventory?city_id={city_id}'),
+    'patient_donations': ('patient', '/patient/my-donations'),
+    'hospital_dashboard': ('hospital', '/hospital/dashboard'),
+    'hospital_requests': ('hospital', '/hospital/requests'),
+    'admin_users': ('admin', '/admin/users'),
+}
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6)
+
+
+def gzip_compress(body, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+def measure(compress, body, repeat):
+    started = time.thread_time()
+    for _ in range(repeat):
+        output = compress(body)
+    cpu = (time.thread_time() - started) / repeat
+    return {
+        'bytes': len(output),
+        'saved_pct': round(100.0 * (1 - len(output) / len(body)), 1) if body else 0.0,
+        'cpu_ms': round(cpu * 1000, 3),
+    }
+
+
+def timed_get(client, path, headers, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(path, headers=headers)
+        size = len(response.get_data())
+        response.close()
+    return size, (time.perf_counter() - started) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark response compression.')
+    parser.add_argument('--database-url', required=True, help='Seeded database.')
+    parser.add_argument('--repeat', type=int, default=20, help='Compressions (and requests) per measurement.')
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    from app.utils.compression import brotli, response_compressor
+
+    app = create_bench_app(args.database_url)
+    app.config['TESTING'] = True
+    # Identical requests must reach the app rather than the page cache
+    from app.utils.response_cache import response_cache
+    response_cache.enabled = False
+    fixtures = Fixtures(app)
+    state_id, city_id = fixtures.cities[0]
+
+    clients = {}
+    for role in sorted({role for role, _ in PAGES.values()}):
+        client = app.test_client()
+        if role != 'anonymous':
+            client.post('/auth/login', data={'email': fixtures.accounts[role][0], 'password': PASSWORD})
+        clients[role] = client
+
+    encoding = 'br' if brotli is not None else 'gzip'
+    pages = {}
+    for name, (role, template) in PAGES.items():
+        path = template.format(state_id=state_id, city_id=city_id)
+        response = clients[role].get(path)
+        body = response.get_data()
+        response.close()
+
+        encodings = {f'gzip-{level}': measure(lambda data, level=level: gzip_compress(data, level),
+                                              body, args.repeat) for level in GZIP_LEVELS}
+        if brotli is not None:
+            encodings.update({f'br-{quality}': measure(lambda data, quality=quality: brotli.compress(data, quality=quality),
+                                                       body, args.repeat) for quality in BROTLI_QUALITIES})
+
+        plain_size, plain_ms = timed_get(clients[role], path, {'Accept-Encoding': 'identity'}, args.repeat)
+        compressed_size, compressed_ms = timed_get(clients[role], path, {'Accept-Encoding': encoding}, args.repeat)
+        pages[name] = {
+            'path': path,
+            'status': response.status_code,
+            'content_type': response.mimetype,
+            'bytes': len(body),
+            'encodings': encodings,
+            'end_to_end': {
+                'encoding': encoding,
+                'bytes': compressed_size,
+                'plain_bytes': plain_size,
+                'latency_ms': round(compressed_ms, 3),
+                'plain_latency_ms': round(plain_ms, 3),
+            },
+        }
+
+    total = sum(page['bytes'] for page in pages.values())
+    totals = {}
+    for key in next(iter(pages.values()))['encodings']:
+        compressed = sum(page['encodings'][key]['bytes'] for page in pages.values())
+        totals[key] = {
+            'bytes': compressed,
+            'saved_pct': round(100.0 * (1 - compressed / total), 1) if total else 0.0,
+            'cpu_ms_per_response': round(sum(page['encodings'][key]['cpu_ms'] for page in pages.values())
+                                         / len(pages), 3),
+        }
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'repeat': args.repeat,
+            'min_size': response_compressor.min_size,
+            'gzip_level': response_compressor.level,
+            'brotli_available': brotli is not None,
+            'python': platform.python_version(),
+        },
+        'totals': dict(totals, uncompressed={'bytes': total}),
+        'pages': pages,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
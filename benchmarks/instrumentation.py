@@ -0,0 +1,107 @@
+"""Measure what the metrics and slow query hooks add to requests and statements.
+
+Two bench-only routes are timed through the test client: ``ping``
+returns a short string, ``query`` runs ``--statements`` ``SELECT 1``
+statements. Both run first on an app created with ``METRICS_ENABLED``
+off and no slow query threshold, then on one with the defaults. The
+cursor listeners are registered on the ``Engine`` class for the whole
+process, so the uninstrumented app has to be measured first. Statements
+stay far below the slow query threshold, so this is the cost every
+statement pays, not the cost of logging a slow one:
+
+    python -m benchmarks.instrumentation --output instrumentation.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+from benchmarks import create_bench_app
+
+
+def add_routes(app, statements):
+    from sqlalchemy import text
+    from app.models import db
+
+    @app.route('/_bench/ping')
+    def bench_ping():
+        return 'ok'
+
+    @app.route('/_bench/query')
+    def bench_query():
+        for _ in range(statements):
+            db.session.execute(text('SELECT 1')).scalar()
+        return 'ok'
+
+
+def timed(client, path, requests, repeat):
+    """Median seconds per request over ``repeat`` rounds"""
+    client.get(path).close()
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path).close()
+        rounds.append((time.perf_counter() - started) / requests)
+    return statistics.median(rounds)
+
+
+def measure(app, args):
+    app.config['TESTING'] = True
+    add_routes(app, args.statements)
+    client = app.test_client()
+    return {
+        'request_s': timed(client, '/_bench/ping', args.requests, args.repeat),
+        'query_request_s': timed(client, '/_bench/query', max(1, args.requests // 10), args.repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the metrics and slow query hooks.')
+    parser.add_argument('--database-url', default='sqlite://', help='Database to run SELECT 1 against.')
+    parser.add_argument('--requests', type=int, default=1000, help='Ping requests per round.')
+    parser.add_argument('--statements', type=int, default=500, help='Statements per query request.')
+    parser.add_argument('--repeat', type=int, default=3, help='Rounds per measurement; the median is kept.')
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    off = measure(create_bench_app(args.database_url, METRICS_ENABLED=False, SLOW_QUERY_THRESHOLD_MS=None), args)
+    on = measure(create_bench_app(args.database_url), args)
+
+    def per_statement(result):
+        # The request's own cost is spread over the statements it runs
+        return (result['query_request_s'] - result['request_s']) / args.statements
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'database': args.database_url.split(':', 1)[0],
+            'requests': args.requests,
+            'statements': args.statements,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+        },
+        'request_us': {
+            'off': round(off['request_s'] * 1e6, 2),
+            'on': round(on['request_s'] * 1e6, 2),
+            'overhead': round((on['request_s'] - off['request_s']) * 1e6, 2),
+        },
+        'statement_us': {
+            'off': round(per_statement(off) * 1e6, 2),
+            'on': round(per_statement(on) * 1e6, 2),
+            'overhead': round((per_statement(on) - per_statement(off)) * 1e6, 2),
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Compare ORM entities with column-projection rows on a large user table.
+
+Tops the ``user`` table up to ``--users`` rows (synthetic patients, so an
+existing seeded database can be reused), then loads the admin user list
+both ways: the old ``User.query...all()`` path, which touches the same
+fields the template prints including the lazy city and state, and
+``app.utils.projections.user_list_rows``. Each run uses a fresh session and
+reports wall time and rows per second, plus the tracemalloc peak of one
+separate load while the rows are held:
+
+    python -m benchmarks.projection --database-url sqlite:///projection.db --users 100000 --output projection.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from benchmarks import create_bench_app
+from benchmarks.seed import bulk_insert
+
+TEMPLATE_FIELDS = ('id', 'name', 'email', 'age', 'blood_group', 'role', 'is_approved', 'created_at',
+                   'hospital_name', 'license_number', 'hospital_contact', 'camp_name', 'camp_contact')
+
+
+def top_up_users(db, target, chunk_size):
+    """Insert synthetic patients until the user table holds ``target`` rows"""
+    from sqlalchemy import func, select
+    from app.models import City, User
+
+    existing = db.session.scalar(select(func.count(User.id)))
+    if existing >= target:
+        return 0
+    cities = db.session.execute(select(City.id, City.state_id).order_by(City.id)).all()
+    next_id = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    now = datetime.utcnow()
+    rows = []
+    for offset in range(target - existing):
+        user_id = next_id + offset
+        city_id, state_id = cities[user_id % len(cities)]
+        rows.append(dict(id=user_id, name=f'Patient {user_id}', email=f'projection{user_id}@bench.local',
+                         password_hash='!', dob=date(1980, 1, 1), age=45, blood_group='O+',
+                         address=f'{user_id} Bench Street', state_id=state_id, city_id=city_id,
+                         role='patient', is_approved=True, created_at=now - timedelta(minutes=user_id)))
+    bulk_insert(db, User, rows, chunk_size)
+    return len(rows)
+
+
+def orm_path():
+    from app.models import User
+
+    users = User.query.order_by(User.created_at.desc()).all()
+    for user in users:
+        for field in TEMPLATE_FIELDS:
+            getattr(user, field)
+        user.city.name, user.state.name
+    return users
+
+
+def projection_path():
+    from app.utils.projections import user_list_rows
+
+    rows = user_list_rows()
+    for row in rows:
+        for field in TEMPLATE_FIELDS:
+            getattr(row, field)
+        row.city_name, row.state_name
+    return rows
+
+
+def measure(db, load, repeat):
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        db.session.remove()
+        gc.collect()
+        started = time.perf_counter()
+        count = len(load())
+        timings.append(time.perf_counter() - started)
+
+    # Tracing slows allocation down, so memory gets its own untimed pass
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    rows = load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del rows
+
+    median = statistics.median(timings)
+    return {
+        'rows': count,
+        'median_s': round(median, 4),
+        'min_s': round(min(timings), 4),
+        'rows_per_s': round(count / median) if median else None,
+        'peak_mib': round(peak / 2 ** 20, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ORM entities against projection rows.')
+    parser.add_argument('--database-url', required=True, help='Database to read (users are added if needed).')
+    parser.add_argument('--users', type=int, default=100000, help='Minimum number of users in the table.')
+    parser.add_argument('--repeat', type=int, default=5, help='Loads per path.')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per multi-row INSERT when topping up.')
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    app = create_bench_app(args.database_url, ACTIVITY_LOG_ASYNC=False)
+    from app.models import db
+    from app.utils.location_data import load_initial_data
+
+    with app.app_context():
+        db.create_all()
+        load_initial_data()
+        inserted = top_up_users(db, args.users, args.chunk_size)
+
+    results = {}
+    for name, load in (('orm', orm_path), ('projection', projection_path)):
+        with app.app_context():
+            results[name] = measure(db, load, args.repeat)
+
+    orm, projection = results['orm'], results['projection']
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'users': orm['rows'],
+            'inserted': inserted,
+            'repeat': args.repeat,
+            'database': args.database_url.split(':', 1)[0],
+            'python': platform.python_version(),
+        },
+        'results': results,
+        'speedup': round(orm['median_s'] / projection['median_s'], 2) if projection['median_s'] else None,
+        'memory_ratio': round(orm['peak_mib'] / projection['peak_mib'], 2) if projection['peak_mib'] else None,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+"""Drive the app concurrently and report per-endpoint latency as JSON.
+
+By default requests go through the Flask test client in-process, which
+isolates application time. With ``--base-url`` they are sent over HTTP
+to a running server instead. Each worker logs in once per role and the
+clock starts only when every worker is ready; workers then pick scenarios
+from a weighted mix using their own seeded RNG. Throughput is measured
+over the window actually recorded, from the first request to the last.
+
+Scenarios that write (approving requests) would leave the database
+different from one run to the next, so in-process runs against a
+file-backed sqlite database work on a temporary copy. Elsewhere they are
+left out of the mix unless ``--allow-writes`` is given.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy.engine import make_url
+
+from benchmarks import create_bench_app
+from benchmarks.seed import BLOOD_GROUPS, PASSWORD
+
+# name -> (role, weight)
+SCENARIOS = {
+    'home': ('anonymous', 5),
+    'search_blood': ('anonymous', 30),
+    'search_camps': ('anonymous', 10),
+    'api_inventory': ('anonymous', 10),
+    'patient_dashboard': ('patient', 10),
+    'certificate_download': ('patient', 2),
+    'hospital_dashboard': ('hospital', 10),
+    'hospital_requests': ('hospital', 5),
+    'approve_request': ('hospital', 3),
+    'hospital_report': ('hospital', 2),
+    'host_dashboard': ('host', 5),
+    'admin_dashboard': ('admin', 3),
+    'admin_approvals': ('admin', 2),
+}
+# Scenarios that change the database they run against
+WRITE_SCENARIOS = {'approve_request'}
+# Approving answers with the same redirect either way; the flashed
+# message's category tells the outcomes apart
+APPROVE_OUTCOMES = {'success': 'approved', 'error': 'insufficient'}
+
+
+def sqlite_copy(database_url):
+    """Copy a file-backed sqlite database to a temporary file.
+
+    Returns ``(url, path)`` for the copy, or None for other databases.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    fd, path = tempfile.mkstemp(prefix='bbms-bench-', suffix='.db')
+    os.close(fd)
+    source, target = sqlite3.connect(url.database), sqlite3.connect(path)
+    try:
+        # The backup API gives a consistent snapshot even with WAL files around
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return url.set(database=path).render_as_string(hide_password=False), path
+
+
+class TestClient:
+    """Adapter over the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        size = len(response.get_data())
+        response.close()
+        return response.status_code, size
+
+    def flashes(self):
+        """Take the flashed messages out of the session"""
+        with self.client.session_transaction() as session:
+            return session.pop('_flashes', [])
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """Minimal cookie-aware HTTP client that does not follow redirects"""
+
+    def __init__(self, base_url, session_serializer):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.session_serializer = session_serializer
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, len(error.read() or b'')
+
+    def flashes(self):
+        """Flashed messages in the session cookie.
+
+        The server's secret is not known here, so the cookie is decoded
+        without checking its signature. Messages stay in the cookie until
+        the next page shows them.
+        """
+        for cookie in self.cookies:
+            if cookie.name == 'session':
+                _, session = self.session_serializer.loads_unsafe(cookie.value)
+                return (session or {}).get('_flashes', [])
+        return []
+
+
+class Fixtures:
+    """Ids and accounts sampled from the seeded database"""
+
+    def __init__(self, app):
+        from app.models import db, User, BloodRequest, BloodDonation
+
+        with app.app_context():
+            self.cities = [(row.state_id, row.city_id) for row in db.session.query(
+                User.state_id, User.city_id).filter(User.role == 'hospital').distinct().limit(50)]
+            self.accounts = {
+                role: [row.email for row in db.session.query(User.email).filter(
+                    User.role == role, User.is_approved == True).order_by(User.id).limit(200)]
+                for role in ('patient', 'hospital', 'host', 'admin')
+            }
+            hospital_ids = {row.email: row.id for row in db.session.query(User.id, User.email)
+                            .filter(User.email.in_(self.accounts['hospital']))}
+            self.pending_requests = {email: [] for email in self.accounts['hospital']}
+            hospital_emails = {hospital_id: email for email, hospital_id in hospital_ids.items()}
+            for row in db.session.query(BloodRequest.id, BloodRequest.hospital_id).filter(
+                    BloodRequest.status == 'pending',
+                    BloodRequest.hospital_id.in_(list(hospital_ids.values()))):
+                self.pending_requests[hospital_emails[row.hospital_id]].append(row.id)
+            patient_ids = {row.email: row.id for row in db.session.query(User.id, User.email)
+                           .filter(User.email.in_(self.accounts['patient']))}
+            self.certificates = {email: [] for email in self.accounts['patient']}
+            donor_emails = {user_id: email for email, user_id in patient_ids.items()}
+            for row in db.session.query(BloodDonation.id, BloodDonation.donor_id).filter(
+                    BloodDonation.status == 'approved',
+                    BloodDonation.certificate_generated == True,
+                    BloodDonation.donor_id.in_(list(patient_ids.values()))):
+                self.certificates[donor_emails[row.donor_id]].append(row.id)
+        self._lock = threading.Lock()
+
+    def available(self, name, account):
+        """Whether ``account`` has the data ``name`` needs"""
+        if name == 'certificate_download':
+            return bool(self.certificates.get(account))
+        if name == 'approve_request':
+            return bool(self.pending_requests.get(account))
+        return True
+
+    def pop_pending_request(self, email):
+        with self._lock:
+            pending = self.pending_requests.get(email)
+            return pending.pop() if pending else None
+
+
+def build_request(name, rng, fixtures, account):
+    """Return (method, path, form data) for one scenario, or None once its data runs out"""
+    state_id, city_id = rng.choice(fixtures.cities)
+    if name == 'home':
+        return 'GET', '/', None
+    if name == 'search_blood':
+        group = rng.choice(BLOOD_GROUPS + [''])
+        query = urllib.parse.urlencode({'state_id': state_id, 'city_id': city_id, 'blood_group': group})
+        return 'GET', f'/search/blood?{query}', None
+    if name == 'search_camps':
+        return 'GET', f'/search/camps?state_id={state_id}&city_id={city_id}', None
+    if name == 'api_inventory':
+        return 'GET', f'/api/inventory?city_id={city_id}', None
+    if name == 'patient_dashboard':
+        return 'GET', '/patient/dashboard', None
+    if name == 'certificate_download':
+        donations = fixtures.certificates.get(account)
+        if not donations:
+            return None
+        return 'GET', f'/patient/download-certificate/{rng.choice(donations)}', None
+    if name == 'hospital_dashboard':
+        return 'GET', '/hospital/dashboard', None
+    if name == 'hospital_requests':
+        return 'GET', '/hospital/requests', None
+    if name == 'approve_request':
+        request_id = fixtures.pop_pending_request(account)
+        if request_id is None:
+            return None
+        return 'GET', f'/hospital/approve-request/{request_id}', None
+    if name == 'hospital_report':
+        report = rng.choice(['donations_monthly', 'requests_monthly'])
+        return 'GET', f'/hospital/download-report/{report}', None
+    if name == 'host_dashboard':
+        return 'GET', '/host/dashboard', None
+    if name == 'admin_dashboard':
+        return 'GET', '/admin/dashboard', None
+    if name == 'admin_approvals':
+        return 'GET', '/admin/approvals', None
+    raise ValueError(f'Unknown scenario {name}')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def login(client, email):
+    status, _ = client.request('POST', '/auth/login', {'email': email, 'password': PASSWORD})
+    # A successful login redirects to the dashboard; a failed one renders the form again
+    if status != 302:
+        raise RuntimeError(f'login as {email} failed with status {status}')
+
+
+def worker(index, args, make_client, fixtures, scenarios, weights, ready, clock, results, failures):
+    rng = random.Random(args.seed * 1000 + index)
+    clients = {}
+    accounts = {}
+    try:
+        for role in sorted({SCENARIOS[name][0] for name in scenarios}):
+            client = make_client()
+            if role != 'anonymous':
+                pool = fixtures.accounts[role]
+                accounts[role] = pool[index % len(pool)]
+                login(client, accounts[role])
+            clients[role] = client
+    except Exception as error:
+        failures[index] = error
+        # Release the other workers instead of leaving them at the barrier
+        ready.abort()
+        return
+    # Each worker logs in as one account per role, so scenarios that need
+    # data this account lacks are left out of its mix before the clock starts
+    mix = {name: weight for name, weight in zip(scenarios, weights)
+           if fixtures.available(name, accounts.get(SCENARIOS[name][0]))}
+
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        return
+    samples = []
+    while mix and time.perf_counter() < clock['deadline']:
+        name = rng.choices(list(mix), list(mix.values()))[0]
+        role = SCENARIOS[name][0]
+        spec = build_request(name, rng, fixtures, accounts.get(role))
+        if spec is None:
+            # Used up during the run, e.g. no pending requests left to approve
+            del mix[name]
+            continue
+        method, path, data = spec
+        started = time.perf_counter()
+        try:
+            status, size = clients[role].request(method, path, data)
+        except Exception:
+            status, size = 'exception', 0
+        finished = time.perf_counter()
+        if name == 'approve_request' and status == 302:
+            flashes = clients[role].flashes()
+            category = flashes[-1][0] if flashes else None
+            name = f'{name}:{APPROVE_OUTCOMES.get(category, "unknown")}'
+        if started >= clock['record_after']:
+            samples.append((name, status, started, finished, size))
+    results[index] = samples
+
+
+def measured_window(samples):
+    """Seconds from the first recorded request's start to the last one's end"""
+    if not samples:
+        return 0.0
+    return max(sample[3] for sample in samples) - min(sample[2] for sample in samples)
+
+
+def summarize(samples, wall_seconds):
+    by_name = {}
+    for name, status, started, finished, size in samples:
+        entry = by_name.setdefault(name, {'latencies': [], 'statuses': {}, 'bytes': 0})
+        entry['latencies'].append((finished - started) * 1000.0)
+        entry['statuses'][str(status)] = entry['statuses'].get(str(status), 0) + 1
+        entry['bytes'] += size
+
+    def describe(latencies, statuses, total_bytes):
+        latencies = sorted(latencies)
+        errors = sum(count for status, count in statuses.items()
+                     if not (status.isdigit() and int(status) < 400))
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                'p50': round(percentile(latencies, 50), 3) if latencies else None,
+                'p95': round(percentile(latencies, 95), 3) if latencies else None,
+                'p99': round(percentile(latencies, 99), 3) if latencies else None,
+                'max': round(latencies[-1], 3) if latencies else None,
+            },
+            'status_counts': statuses,
+            'bytes': total_bytes,
+        }
+
+    endpoints = {name: describe(entry['latencies'], entry['statuses'], entry['bytes'])
+                 for name, entry in sorted(by_name.items())}
+    all_statuses = {}
+    for entry in by_name.values():
+        for status, count in entry['statuses'].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    overall = describe([(s[3] - s[2]) * 1000.0 for s in samples], all_statuses, sum(s[4] for s in samples))
+    return endpoints, overall
+
+
+def run(args, database_url, scenarios, weights):
+    """Drive the workers and return the report"""
+    app = create_bench_app(database_url)
+    app.config['TESTING'] = True
+    from app.models import db
+    fixtures = Fixtures(app)
+    if args.base_url:
+        serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+        make_client = lambda: HttpClient(args.base_url, serializer)
+    else:
+        make_client = lambda: TestClient(app)
+
+    # Scenarios for a role without accounts could never run
+    missing = [name for name in scenarios
+               if SCENARIOS[name][0] != 'anonymous' and not fixtures.accounts[SCENARIOS[name][0]]]
+    if missing:
+        print(f'Skipping {", ".join(missing)}: no approved accounts for the role', file=sys.stderr)
+        weights = [weight for name, weight in zip(scenarios, weights) if name not in missing]
+        scenarios = [name for name in scenarios if name not in missing]
+    if not scenarios:
+        raise SystemExit('No scenario can run against this database')
+
+    clock = {}
+
+    def start_clock():
+        # Runs once, after every worker has logged in
+        clock['record_after'] = time.perf_counter() + args.warmup
+        clock['deadline'] = clock['record_after'] + args.duration
+
+    ready = threading.Barrier(args.concurrency, action=start_clock)
+    results = [None] * args.concurrency
+    failures = [None] * args.concurrency
+    threads = [threading.Thread(target=worker, args=(i, args, make_client, fixtures, scenarios, weights,
+                                                     ready, clock, results, failures))
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        # Let go of the database file before a temporary copy is removed
+        db.engine.dispose()
+    errors = [str(error) for error in failures if error is not None]
+    if errors:
+        raise SystemExit(f'Workers failed to start: {"; ".join(errors)}')
+
+    samples = [sample for worker_samples in results if worker_samples for sample in worker_samples]
+    window = measured_window(samples)
+    endpoints, overall = summarize(samples, window)
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'mode': 'http' if args.base_url else 'test_client',
+            'base_url': args.base_url,
+            'database': make_url(args.database_url).render_as_string(hide_password=True),
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'measured_s': round(window, 3),
+            'warmup_s': args.warmup,
+            'seed': args.seed,
+            'scenarios': scenarios,
+            'python': platform.python_version(),
+        },
+        'overall': overall,
+        'endpoints': endpoints,
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run concurrent benchmark scenarios.')
+    parser.add_argument('--database-url', required=True, help='Seeded database (also used to sample fixtures).')
+    parser.add_argument('--base-url', default=None, help='Send requests over HTTP to this server instead of the test client.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds.')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds excluded from the results.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenario', default='all', help='Comma-separated scenario names, or "all".')
+    parser.add_argument('--allow-writes', action='store_true',
+                        help='Run writing scenarios against the database itself when it cannot be copied.')
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    scenarios = list(SCENARIOS) if args.scenario == 'all' else args.scenario.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(unknown)}')
+
+    database_url, copy_path = args.database_url, None
+    writes = [name for name in scenarios if name in WRITE_SCENARIOS]
+    if writes and not args.base_url:
+        copy = sqlite_copy(args.database_url)
+        if copy is not None:
+            database_url, copy_path = copy
+    if writes and copy_path is None and not args.allow_writes:
+        if args.scenario != 'all':
+            parser.error(f'{", ".join(writes)} would change the database; pass --allow-writes')
+        scenarios = [name for name in scenarios if name not in WRITE_SCENARIOS]
+        print(f'Skipping {", ".join(writes)}: the database cannot be copied (pass --allow-writes to include)',
+              file=sys.stderr)
+    weights = [SCENARIOS[name][1] for name in scenarios]
+
+    try:
+        report = run(args, database_url, scenarios, weights)
+    finally:
+        if copy_path is not None:
+            os.remove(copy_path)
+    report['meta']['database_copy'] = copy_path is not None
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
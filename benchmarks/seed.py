@@ -0,0 +1,213 @@
+"""Seed a database with a reproducible synthetic data set.
+
+Volumes are multiplied by ``--scale`` and every value is drawn from a
+``random.Random`` seeded with ``--seed``. Timestamps are offsets from the
+time of seeding, so hot activity windows, upcoming camps and recent
+requests look like live data; two runs with the same arguments produce
+the same data set shifted in time, unless ``--now`` pins the reference
+time. Password hashes (random salts) and columns left to their insert
+defaults still differ between runs, so the files are not byte-identical.
+Rows are bulk-inserted with multi-row INSERTs in chunks.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from benchmarks import create_bench_app
+
+PASSWORD = 'password'
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+# Rough population distribution of ABO/Rh groups
+BLOOD_GROUP_WEIGHTS = [22, 2, 32, 2, 8, 1, 30, 3]
+
+BASE_VOLUMES = {
+    'patients': 5000,
+    'hospitals': 200,
+    'hosts': 50,
+    'camps': 300,
+    'requests': 20000,
+    'donations': 20000,
+    'activities': 50000,
+}
+
+
+def chunked(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def bulk_insert(db, model, rows, chunk_size):
+    for chunk in chunked(rows, chunk_size):
+        db.session.execute(insert(model), chunk)
+    db.session.commit()
+
+
+def seed(app, seed_value=42, scale=1.0, chunk_size=5000, hot_cities=5, now=None):
+    """Generate and insert the data set, returning the volumes written"""
+    from app.models import (db, User, City, BloodInventory, BloodRequest, BloodDonation,
+                            BloodCamp, CampInventory, Activity)
+    from app.utils.donor_callout import backfill_donor_history
+
+    rng = random.Random(seed_value)
+    now = now or datetime.utcnow()
+    today = now.date()
+    volumes = {name: max(1, int(count * scale)) for name, count in BASE_VOLUMES.items()}
+    password_hash = generate_password_hash(PASSWORD)
+
+    with app.app_context():
+        cities = [(c.id, c.state_id) for c in City.query.order_by(City.id)]
+        # Most traffic concentrates on a handful of large cities
+        hot = cities[:hot_cities]
+
+        def pick_city():
+            return rng.choice(hot) if rng.random() < 0.6 else rng.choice(cities)
+
+        def pick_group():
+            return rng.choices(BLOOD_GROUPS, BLOOD_GROUP_WEIGHTS)[0]
+
+        def user_row(user_id, role, email, **extra):
+            city_id, state_id = pick_city()
+            dob = date(1960, 1, 1) + timedelta(days=rng.randint(0, 15000))
+            row = dict(id=user_id, name=f'{role.title()} {user_id}', email=email,
+                       password_hash=password_hash, dob=dob, age=today.year - dob.year,
+                       blood_group=pick_group(), address=f'{user_id} Bench Street',
+                       state_id=state_id, city_id=city_id, role=role, is_approved=True,
+                       created_at=now - timedelta(days=rng.randint(0, 730)),
+                       hospital_name=None, license_number=None, hospital_address=None,
+                       hospital_contact=None, camp_name=None, camp_address=None, camp_contact=None)
+            row.update(extra)
+            return row
+
+        users = [user_row(1, 'admin', 'admin@bench.local')]
+        next_id = 2
+        patient_ids, hospital_ids, host_ids = [], [], []
+        for i in range(volumes['patients']):
+            users.append(user_row(next_id, 'patient', f'patient{i}@bench.local'))
+            patient_ids.append(next_id)
+            next_id += 1
+        for i in range(volumes['hospitals']):
+            users.append(user_row(next_id, 'hospital', f'hospital{i}@bench.local',
+                                  hospital_name=f'Bench Hospital {i}', license_number=f'LIC-{i:06d}',
+                                  hospital_address=f'{i} Hospital Road', hospital_contact=f'98{i:08d}',
+                                  is_approved=rng.random() > 0.05))
+            hospital_ids.append(next_id)
+            next_id += 1
+        for i in range(volumes['hosts']):
+            users.append(user_row(next_id, 'host', f'host{i}@bench.local',
+                                  camp_name=f'Bench Camps {i}', camp_address=f'{i} Camp Lane',
+                                  camp_contact=f'97{i:08d}', is_approved=rng.random() > 0.05))
+            host_ids.append(next_id)
+            next_id += 1
+        bulk_insert(db, User, users, chunk_size)
+        user_city = {u['id']: (u['city_id'], u['state_id']) for u in users}
+        user_group = {u['id']: u['blood_group'] for u in users}
+
+        inventory = []
+        for hospital_id in hospital_ids:
+            for group in BLOOD_GROUPS:
+                if rng.random() < 0.85:
+                    inventory.append(dict(hospital_id=hospital_id, blood_group=group,
+                                          units_available=rng.randint(0, 60),
+                                          last_updated=now - timedelta(minutes=rng.randint(0, 10000))))
+        bulk_insert(db, BloodInventory, inventory, chunk_size)
+
+        camps, camp_ids = [], []
+        for camp_id in range(1, volumes['camps'] + 1):
+            host_id = rng.choice(host_ids)
+            city_id, state_id = pick_city()
+            start = today + timedelta(days=rng.randint(-60, 30))
+            camps.append(dict(id=camp_id, host_id=host_id, name=f'Bench Camp {camp_id}',
+                              address=f'{camp_id} Camp Ground', state_id=state_id, city_id=city_id,
+                              start_date=start, end_date=start + timedelta(days=rng.randint(1, 14)),
+                              contact_number=f'96{camp_id:08d}', is_active=True,
+                              created_at=now - timedelta(days=rng.randint(0, 90))))
+            camp_ids.append(camp_id)
+        bulk_insert(db, BloodCamp, camps, chunk_size)
+        bulk_insert(db, CampInventory, [
+            dict(camp_id=camp_id, blood_group=group, units_available=rng.randint(0, 20), last_updated=now)
+            for camp_id in camp_ids for group in BLOOD_GROUPS if rng.random() < 0.5
+        ], chunk_size)
+
+        requests = []
+        for request_id in range(1, volumes['requests'] + 1):
+            requested = now - timedelta(minutes=rng.randint(0, 525600))
+            status = rng.choices(['pending', 'approved', 'rejected'], [20, 65, 15])[0]
+            requests.append(dict(id=request_id, patient_id=rng.choice(patient_ids),
+                                 hospital_id=rng.choice(hospital_ids), blood_group=pick_group(),
+                                 units_requested=rng.randint(1, 4),
+                                 request_type='critical' if rng.random() < 0.15 else 'normal',
+                                 status=status, request_date=requested,
+                                 response_date=None if status == 'pending' else
+                                 requested + timedelta(minutes=rng.randint(5, 2880)),
+                                 notes=None))
+        bulk_insert(db, BloodRequest, requests, chunk_size)
+
+        donations = []
+        for donation_id in range(1, volumes['donations'] + 1):
+            donor_id = rng.choice(patient_ids)
+            at_camp = rng.random() < 0.3
+            status = rng.choices(['pending', 'approved', 'rejected'], [15, 75, 10])[0]
+            created = now - timedelta(minutes=rng.randint(0, 525600))
+            donations.append(dict(id=donation_id, donor_id=donor_id,
+                                  hospital_id=None if at_camp else rng.choice(hospital_ids),
+                                  camp_id=rng.choice(camp_ids) if at_camp else None,
+                                  blood_group=user_group[donor_id], units_donated=1,
+                                  donation_date=created.date(), status=status,
+                                  certificate_generated=status == 'approved', created_at=created))
+        bulk_insert(db, BloodDonation, donations, chunk_size)
+        backfill_donor_history(chunk_size=chunk_size)
+
+        activities = []
+        for _ in range(volumes['activities']):
+            if rng.random() < 0.5:
+                request = rng.choice(requests)
+                activities.append(dict(user_id=request['patient_id'], activity_type='request',
+                                       description=f"Requested {request['units_requested']} units of {request['blood_group']} blood",
+                                       created_at=request['request_date'], request_id=request['id'], donation_id=None))
+            else:
+                donation = rng.choice(donations)
+                activities.append(dict(user_id=donation['donor_id'],
+                                       activity_type='camp_registration' if donation['camp_id'] else 'donation',
+                                       description=f"Scheduled blood donation on {donation['donation_date']:%B %d, %Y}",
+                                       created_at=donation['created_at'], donation_id=donation['id'], request_id=None))
+        bulk_insert(db, Activity, activities, chunk_size)
+
+    volumes['users'] = len(users)
+    volumes['inventory'] = len(inventory)
+    return volumes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed a benchmark database with synthetic data.')
+    parser.add_argument('--database-url', required=True, help='e.g. sqlite:///bench.db or mysql+pymysql://user:pw@localhost/bench')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier applied to every base volume.')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per multi-row INSERT.')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate all tables first.')
+    parser.add_argument('--now', type=datetime.fromisoformat, default=None,
+                        help='Pin the reference time (e.g. 2025-01-01T00:00) so generated timestamps match across runs.')
+    args = parser.parse_args(argv)
+
+    app = create_bench_app(args.database_url, ACTIVITY_LOG_ASYNC=False)
+    from app.models import db
+    from app.utils.location_data import load_initial_data
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        load_initial_data()
+
+    started = time.perf_counter()
+    volumes = seed(app, seed_value=args.seed, scale=args.scale, chunk_size=args.chunk_size, now=args.now)
+    print(json.dumps({'seed': args.seed, 'scale': args.scale, 'volumes': volumes,
+                      'seconds': round(time.perf_counter() - started, 2)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()